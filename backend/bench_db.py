@@ -0,0 +1,125 @@
+"""
+get_db() eszamanlilik benchmark'i: eski baglanti-basina-istek + rollback journal
+modu ile yeni thread havuzu + WAL ayarlarini karsilastirir.
+
+Kullanim: python bench_db.py [okuyucu_sayisi] [yazici_sayisi] [saniye]
+Gecici veritabanlari olusturur, gercek matchify.db'ye dokunmaz.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+BENCH_DIR = tempfile.mkdtemp(prefix="matchify-bench-")
+os.environ["MATCHIFY_DB_PATH"] = os.path.join(BENCH_DIR, "after.db")
+
+import main  # noqa: E402  (DB yolu ayarlandiktan sonra import edilmeli)
+
+LEGACY_DB_PATH = os.path.join(BENCH_DIR, "before.db")
+
+
+@contextmanager
+def legacy_get_db(write: bool = False):
+    """Onceki get_db: her kullanimda yeni baglanti, varsayilan ayarlar"""
+    conn = sqlite3.connect(LEGACY_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def seed(job_count: int = 20000):
+    with main.get_db(write=True) as conn:
+        conn.execute("INSERT INTO users (email, password, role) VALUES ('a@bench', 'x', 'employer')")
+        conn.execute("INSERT INTO users (email, password, role) VALUES ('b@bench', 'x', 'jobseeker')")
+        conn.executemany(
+            "INSERT INTO jobs (employer_id, title, description) VALUES (1, ?, ?)",
+            ((f"Ilan {i}", "Python backend gelistirici " * 20) for i in range(job_count)),
+        )
+        conn.commit()
+
+        legacy = sqlite3.connect(LEGACY_DB_PATH)
+        conn.backup(legacy)
+        legacy.execute("PRAGMA journal_mode = DELETE")
+        legacy.close()
+
+
+def read_jobs(get_db):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, title, description, employer_id, created_at
+            FROM jobs ORDER BY created_at DESC, id DESC LIMIT 10 OFFSET 100
+        """)
+        cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM jobs")
+        cursor.fetchone()
+
+
+def write_message(get_db):
+    with get_db(write=True) as conn:
+        conn.execute(
+            "INSERT INTO messages (sender_id, receiver_id, content) VALUES (1, 2, ?)",
+            ("benchmark mesaji",),
+        )
+        conn.commit()
+
+
+def run(get_db, readers: int, writers: int, seconds: float) -> dict:
+    stop = time.perf_counter() + seconds
+    lock = threading.Lock()
+    stats = {"reads": 0, "writes": 0, "errors": 0, "read_latencies": []}
+
+    def worker(op, counter):
+        latencies = []
+        done = errors = 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                op(get_db)
+                done += 1
+                latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            stats[counter] += done
+            stats["errors"] += errors
+            if counter == "reads":
+                stats["read_latencies"].extend(latencies)
+
+    threads = [threading.Thread(target=worker, args=(read_jobs, "reads")) for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=(write_message, "writes")) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = sorted(stats["read_latencies"]) or [0.0]
+    return {
+        "reads/s": stats["reads"] / seconds,
+        "writes/s": stats["writes"] / seconds,
+        "read p50 ms": latencies[len(latencies) // 2] * 1000,
+        "read p99 ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "errors": stats["errors"],
+    }
+
+
+def main_bench():
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+    seed()
+
+    print(f"{readers} okuyucu, {writers} yazici, {seconds:g} sn\n")
+    results = {"once": run(legacy_get_db, readers, writers, seconds), "sonra": run(main.get_db, readers, writers, seconds)}
+    print(f"{'':<14}{'once':>12}{'sonra':>12}")
+    for key in results["once"]:
+        print(f"{key:<14}{results['once'][key]:>12.1f}{results['sonra'][key]:>12.1f}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,91 @@
+"""
+send_message yazma yolu benchmark'i: mesaj basina transaction (DB havuzu uzerinden,
+run_db ile ayni) ile toplu commit (MessageWriter) modlarini 1, 10 ve 100 eszamanli
+gonderici ile karsilastirir.
+
+Kullanim: python bench_messages.py [saniye] [gonderici_sayilari]
+  ornek: python bench_messages.py 3 1,10,100
+Gecici bir veritabani olusturur, gercek matchify.db'ye dokunmaz.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="matchify-bench-")
+os.environ["MATCHIFY_DB_PATH"] = os.path.join(BENCH_DIR, "messages.db")
+
+import main  # noqa: E402  (DB yolu ayarlandiktan sonra import edilmeli)
+
+USER_COUNT = 200
+
+
+def seed():
+    with main.get_db(write=True) as conn:
+        conn.executemany(
+            "INSERT INTO users (email, password, role) VALUES (?, 'x', 'jobseeker')",
+            ((f"u{i}@bench",) for i in range(USER_COUNT)),
+        )
+        conn.commit()
+
+
+def direct_send(sender_id: int, message):
+    return main.db_executor.submit(main.store_message, sender_id, message).result()
+
+
+def run(send, senders: int, seconds: float) -> dict:
+    stop = time.perf_counter() + seconds
+    lock = threading.Lock()
+    stats = {"sent": 0, "latencies": []}
+
+    def worker(index: int):
+        sender_id = index % USER_COUNT + 1
+        receiver_id = (index + 1) % USER_COUNT + 1
+        message = main.MessageCreate(receiver_id=receiver_id, content="benchmark mesaji")
+        latencies = []
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            send(sender_id, message)
+            latencies.append(time.perf_counter() - start)
+        with lock:
+            stats["sent"] += len(latencies)
+            stats["latencies"].extend(latencies)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(senders)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = sorted(stats["latencies"]) or [0.0]
+    return {
+        "mesaj/s": stats["sent"] / seconds,
+        "p50 ms": latencies[len(latencies) // 2] * 1000,
+        "p99 ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main_bench():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    sender_counts = [int(n) for n in (sys.argv[2] if len(sys.argv) > 2 else "1,10,100").split(",")]
+    seed()
+
+    writer = main.MessageWriter(main.MESSAGE_BATCH_MAX, main.MESSAGE_BATCH_WAIT_MS)
+
+    def grouped_send(sender_id: int, message):
+        return writer.submit(sender_id, message).result()
+
+    print(f"DB havuzu {main.DB_POOL_SIZE} thread, grup en fazla {main.MESSAGE_BATCH_MAX} mesaj / "
+          f"{main.MESSAGE_BATCH_WAIT_MS:g} ms, {seconds:g} sn\n")
+    print(f"{'gonderici':<10}{'mod':<10}{'mesaj/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for senders in sender_counts:
+        for name, send in (("tekil", direct_send), ("toplu", grouped_send)):
+            result = run(send, senders, seconds)
+            print(f"{senders:<10}{name:<10}{result['mesaj/s']:>12.0f}{result['p50 ms']:>10.2f}{result['p99 ms']:>10.2f}")
+    print(f"\ntoplu mod: {writer.messages} mesaj, {writer.batches} commit "
+          f"(ortalama grup {writer.messages / max(writer.batches, 1):.1f})")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,85 @@
+"""
+/jobs?search= benchmark: eski LIKE '%term%' sorgusu ile FTS5 yolunu karsilastirir.
+
+Kullanim: python bench_search.py [ilan_sayisi]   (varsayilan 100000)
+Gecici bir veritabani olusturur, gercek matchify.db'ye dokunmaz.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.mkdtemp(prefix="matchify-bench-"), "bench.db")
+os.environ["MATCHIFY_DB_PATH"] = BENCH_DB
+
+import main  # noqa: E402  (DB yolu ayarlandiktan sonra import edilmeli)
+from seed_jobs import JOBS  # noqa: E402
+
+QUERIES = ["python", "react developer", "devops kubernetes", "yazilim", "veri bilimi", "mobil"]
+REPEAT = 20
+
+
+def seed(count: int):
+    rng = random.Random(42)
+    cities = ["İstanbul", "Ankara", "İzmir", "Mersin", "Uzaktan"]
+    with main.get_db(write=True) as conn:
+        conn.executemany(
+            "INSERT INTO jobs (employer_id, title, description) VALUES (?, ?, ?)",
+            (
+                (
+                    1,
+                    f"{job['title']} - {rng.choice(cities)}",
+                    job["description"].strip() + f"\nIlan no: {i}",
+                )
+                for i in range(count)
+                for job in [rng.choice(JOBS)]
+            ),
+        )
+        conn.commit()
+
+
+def like_search(search: str, page: int = 1, limit: int = 10):
+    """Eski list_jobs arama yolu (iki LIKE taramasi: sayfa + COUNT)"""
+    term = f"%{search}%"
+    with main.get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, title, description, employer_id, created_at
+            FROM jobs
+            WHERE title LIKE ? OR description LIKE ?
+            ORDER BY created_at DESC
+            LIMIT ? OFFSET ?
+        """, (term, term, limit, (page - 1) * limit))
+        cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM jobs WHERE title LIKE ? OR description LIKE ?", (term, term))
+        return cursor.fetchone()[0]
+
+
+# Endpoint'in senkron govdesi (@db_handler'in async sarmalayicisi olmadan)
+list_jobs = main.list_jobs.__wrapped__
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(*args)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main_bench():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{count} ilan ekleniyor ({BENCH_DB})...")
+    seed(count)
+
+    print(f"\n{'sorgu':<22}{'LIKE ms':>10}{'FTS5 ms':>10}{'LIKE n':>10}{'FTS5 n':>10}")
+    for query in QUERIES:
+        like_ms = timed(like_search, query)
+        fts_ms = timed(lambda q: list_jobs(search=q, page=1, limit=10, user={}), query)
+        like_total = like_search(query)
+        fts_total = list_jobs(search=query, page=1, limit=10, user={})["total"]
+        print(f"{query:<22}{like_ms:>10.2f}{fts_ms:>10.2f}{like_total:>10}{fts_total:>10}")
+
+
+if __name__ == "__main__":
+    main_bench()
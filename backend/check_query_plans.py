@@ -0,0 +1,76 @@
+"""
+Sicak sorgularin EXPLAIN QUERY PLAN ciktisini kontrol eder.
+
+Indekssiz tam tablo taramasi (SCAN <tablo>) yapan veya beklenen plani (orn.
+keyset sayfalamada indeks aramasi) kullanmayan sorgu varsa listeler ve sifirdan
+farkli kodla cikar. Migration'lar uygulanmis gecici bir veritabani
+uzerinde calisir, gercek matchify.db'ye dokunmaz.
+
+Kullanim: python check_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+os.environ["MATCHIFY_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="matchify-plan-"), "plan.db")
+
+import main  # noqa: E402  (DB yolu ayarlandiktan sonra import edilmeli)
+
+# (ad, sorgu, parametreler[, planda bulunmasi gereken ifade])
+# Sorgular main.py'deki sabitlerden ve sorgu kuran fonksiyonlardan alinir; handler'larin
+# calistirdigi SQL ile kontrol edilen SQL ayni metindir.
+HOT_QUERIES = [
+    ("son CV", main.LATEST_CV_ID_SQL, (1,)),
+    ("CV listesi", main.CV_LIST_SQL, (1,)),
+    ("basvurularim", main.MY_APPLICATIONS_SQL, (1,)),
+    ("isverene gelen basvurular", main.EMPLOYER_APPLICATIONS_SQL, (1,)),
+    ("basvuru kontrolu", main.APPLICATION_EXISTS_SQL, (1, 1)),
+    ("ilana gelen basvurular", *main.job_applications_query(1, "score", None, 51)),
+    ("ilana gelen basvurular (cursor)", *main.job_applications_query(1, "score", [50.0, 100], 51),
+     "SEARCH a USING INDEX idx_applications_job_score (job_id=? AND match_score<?)"),
+    ("ilana gelen basvurular (tarih, cursor)",
+     *main.job_applications_query(1, "date", ["2024-01-01 00:00:00", 100], 51),
+     "SEARCH a USING INDEX idx_applications_job_date (job_id=? AND applied_at<?)"),
+    ("ilan listesi", main.JOBS_PAGE_SQL, (10, 0)),
+    ("ilan listesi (cursor)", main.JOBS_AFTER_SQL, ("2024-01-01 00:00:00", 100, 10),
+     "SEARCH jobs USING INDEX idx_jobs_created"),
+    ("panel istatistikleri", main.USER_STATS_SQL, (1,)),
+    ("isverenin ilanlari", main.EMPLOYER_JOBS_SQL, (1,)),
+    ("okunmamis sayaci", main.USER_UNREAD_SQL, (1,)),
+    ("mesaj gecmisi sayfasi", *main.message_page_query(1, 2, None, 1000, None, 50)),
+    ("yeni mesajlar (yoklama)", *main.message_page_query(1, 2, None, None, 1000, 50)),
+    ("okundu isaretleme", main.MARK_READ_SQL, (1, 2, 1000)),
+    ("sohbet listesi", main.CONVERSATIONS_SQL, (1, 1, 1, 1)),
+    ("sohbet ozeti yaz", main.CONVERSATION_UPSERT_SQL, (1, 2, None, "x", 1, 0, 1)),
+    ("email ile kullanici", main.USER_BY_EMAIL_SQL, ("a@b.c",)),
+]
+
+# Indeks kullanmayan tablo taramasi: "SCAN jobs" (ama "SCAN jobs USING INDEX ..." degil)
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def main_check() -> int:
+    failures = []
+    with main.get_db(write=True) as conn:
+        cursor = conn.cursor()
+        for name, query, params, *expected in HOT_QUERIES:
+            cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+            details = [r["detail"] for r in cursor.fetchall()]
+            scans = [d for d in details if FULL_SCAN.match(d.strip())]
+            # Keyset sayfalama indeks uzerinde arama (SEARCH) yapmali; indeks taramasi O(offset)'tir
+            missing = [e for e in expected if not any(d.startswith(e) for d in details)]
+            status = "SCAN" if scans else "PLAN" if missing else "ok"
+            print(f"[{status:>4}] {name}: " + " | ".join(details))
+            if scans or missing:
+                failures.append(name)
+
+    if failures:
+        print(f"\nTam tablo taramasi yapan / beklenen plani kullanmayan sorgular: {', '.join(failures)}")
+        return 1
+    print("\nTum sicak sorgular indeks kullaniyor.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_check())
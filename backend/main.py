@@ -1,10 +1,12 @@
 from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from PyPDF2 import PdfReader
 import docx as docx_lib
 import io
+import base64
 import sqlite3
 from sentence_transformers import SentenceTransformer
 import numpy as np
@@ -14,7 +16,20 @@ import os
 from dotenv import load_dotenv
 from openai import OpenAI
 import json
+import asyncio
+import bisect
+import functools
+import hashlib
+import html
+import re
+import unicodedata
+import queue
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
+from functools import lru_cache
 
 # ---- JWT imports ----
 from jose import JWTError, jwt
@@ -29,7 +44,143 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 
 # Database path
-DB_PATH = os.path.join(os.path.dirname(__file__), "matchify.db")
+DB_PATH = os.getenv("MATCHIFY_DB_PATH", os.path.join(os.path.dirname(__file__), "matchify.db"))
+
+# Dogrulanmis token onbellegi ayarlari
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))
+
+
+class LRUCache:
+    """Thread-safe, boyutu sinirli LRU onbellek (istege bagli TTL ile).
+
+    sizeof verilirse kayitlarin tahmini toplam boyutu `size` alaninda tutulur.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None, sizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at, _ = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._discard(key)
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        size = self._sizeof(value) if self._sizeof else 0
+        with self._lock:
+            if key in self._data:
+                self._discard(key)
+            self._data[key] = (value, time.monotonic() + ttl if ttl is not None else None, size)
+            self.size += size
+            while len(self._data) > self.maxsize:
+                self._discard(next(iter(self._data)))
+
+    def _discard(self, key):
+        self.size -= self._data.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """Ayni anahtarli eszamanli cagrilari tek hesaplamada birlestirir (singleflight).
+
+    Anahtar icin ilk gelen cagri hesaplar; hesaplama surerken gelen ayni anahtarli
+    cagrilar onun sonucunu bekler. Basarili sonuc bittikten sonra `window` saniye daha
+    paylasilir. Hatalar bekleyenlere iletilir ama saklanmaz.
+    """
+
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self._calls = {}  # anahtar -> [Future, paylasim bitis zamani (hesaplanirken None)]
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def _join(self, key):
+        now = time.monotonic()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and (call[1] is None or call[1] > now):
+                self.shared += 1
+                return call[0], False
+            for expired in [k for k, c in self._calls.items() if c[1] is not None and c[1] <= now]:
+                del self._calls[expired]
+            future = Future()
+            # Calisiyor olarak isaretlenen Future iptal edilemez; bir bekleyenin iptali
+            # (asyncio.wrap_future uzerinden) digerlerine yayilmaz
+            future.set_running_or_notify_cancel()
+            self._calls[key] = [future, None]
+            self.executed += 1
+            return future, True
+
+    def _run(self, key, future: Future, fn, args, kwargs):
+        """Hesaplamayi yapar ve sonucu (veya hatayi) bekleyenlere iletir"""
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            error = e
+        else:
+            error = None
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call[0] is future:
+                if error is None and self.window > 0:
+                    call[1] = time.monotonic() + self.window
+                else:
+                    del self._calls[key]
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def do(self, key, fn, *args, **kwargs):
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        return future.result()
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """do'nun async karsiligi; fn thread havuzunda calisir, event loop bloklanmaz.
+
+        Hesaplama onu baslatan istekten bagimsiz yurur: ilk istemci baglantiyi kapatsa
+        (istek iptal edilse) bile diger bekleyenler sonucu alir.
+        """
+        future, leader = self._join(key)
+        if leader:
+            asyncio.get_running_loop().run_in_executor(None, self._run, key, future, fn, args, kwargs)
+        return await asyncio.wrap_future(future)
+
+    def forget(self, predicate):
+        """Kosula uyan anahtarlarin sonucunu unutur (sonraki cagri yeniden hesaplar)"""
+        with self._lock:
+            for key in [k for k in self._calls if predicate(k)]:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(1 for call in self._calls.values() if call[1] is None)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -43,16 +194,29 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
+# token -> dogrulanmis payload; imza her istekte yeniden dogrulanmaz
+verified_tokens = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+
+
 def verify_token(token: str = Depends(oauth2_scheme)):
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Gecersiz veya suresi dolmus token",
         )
 
+    # Onbellekte token'in suresinden uzun kalmaz
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        verified_tokens.set(token, payload, ttl=min(remaining, TOKEN_CACHE_TTL))
+    return payload
+
 
 app = FastAPI(title="Matchify API")
 
@@ -68,156 +232,563 @@ app.add_middleware(
 
 
 # ---- SQLite baglantisi ----
-@contextmanager
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+# Her thread kendi okuma ve yazma baglantisini tekrar kullanir (WAL modunda
+# okuyucular yazicilari beklemez). Ayarlar ortam degiskenleriyle degistirilebilir.
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", 32768))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", 256))
+
+_db_local = threading.local()
+
+
+def open_db_connection(readonly: bool = False) -> sqlite3.Connection:
+    """Ayarlari yapilmis yeni bir SQLite baglantisi acar"""
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=DB_STATEMENT_CACHE,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if readonly:
+        conn.execute("PRAGMA query_only = 1")
+    return conn
+
+
+@contextmanager
+def get_db(write: bool = False):
+    """Thread'e ait havuzlanmis baglantiyi verir.
+
+    Okuma icin query_only baglanti, yazma icin (write=True) ayri bir baglanti
+    kullanilir. Ic ice kullanimda ayni baglanti doner; en distaki blok
+    bittiginde commit edilmemis islem geri alinir.
+    """
+    slots = getattr(_db_local, "slots", None)
+    if slots is None:
+        slots = _db_local.slots = {}
+    slot = slots.get(write)
+    if slot is None:
+        slot = slots[write] = [open_db_connection(readonly=not write), 0]
+
+    conn = slot[0]
+    slot[1] += 1
     try:
         yield conn
     finally:
-        conn.close()
+        slot[1] -= 1
+        if slot[1] == 0 and conn.in_transaction:
+            conn.rollback()
 
 
-def init_db():
-    """Veritabani tablolarini olusturur"""
-    with get_db() as conn:
-        cursor = conn.cursor()
+# ---- Veritabani executor'u ----
+# Veritabani isleri FastAPI'nin paylasilan threadpool'u yerine sabit boyutlu ayri
+# bir havuzda calisir; yavas sorgular diger istekleri aclige ugratmaz. Havuzda
+# bekleyen+calisan is sayisi sinirlidir, sinira ulasilirsa istek kisa bir sure
+# bekler ve yer acilmazsa 503 doner.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 8))
+DB_QUEUE_MAX = int(os.getenv("DB_QUEUE_MAX", 256))
+DB_QUEUE_TIMEOUT = float(os.getenv("DB_QUEUE_TIMEOUT", 2.0))
 
-        # Users tablosu
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL CHECK(role IN ('employer', 'jobseeker')),
-                full_name TEXT,
-                phone TEXT,
-                bio TEXT,
-                location TEXT,
-                company_name TEXT,
-                website TEXT,
-                linkedin TEXT,
-                skills TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+_db_slots = None
 
-        # Mevcut users tablosuna yeni kolonlar ekle (migration)
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN full_name TEXT")
-        except: pass
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN phone TEXT")
-        except: pass
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN bio TEXT")
-        except: pass
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN location TEXT")
-        except: pass
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN company_name TEXT")
-        except: pass
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN website TEXT")
-        except: pass
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN linkedin TEXT")
-        except: pass
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN skills TEXT")
-        except: pass
+db_metrics = {
+    "submitted": 0,
+    "rejected": 0,
+    "in_flight": 0,
+    "queue_wait_ms_total": 0.0,
+    "queue_wait_ms_max": 0.0,
+    "run_ms_total": 0.0,
+}
 
-        # CVs tablosu
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cvs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                filename TEXT NOT NULL,
-                text_content TEXT NOT NULL,
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
 
-        # Jobs tablosu
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS jobs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employer_id INTEGER,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employer_id) REFERENCES users(id)
-            )
-        """)
+_db_metrics_lock = threading.Lock()
 
-        # Match history tablosu
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS match_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                cv_id INTEGER NOT NULL,
-                job_id INTEGER NOT NULL,
-                score REAL NOT NULL,
-                matched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (cv_id) REFERENCES cvs(id),
-                FOREIGN KEY (job_id) REFERENCES jobs(id),
-                UNIQUE(user_id, cv_id, job_id)
-            )
-        """)
 
-        # Applications tablosu
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS applications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                cv_id INTEGER,
-                cover_letter TEXT,
-                status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'reviewed', 'accepted', 'rejected')),
-                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (job_id) REFERENCES jobs(id),
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (cv_id) REFERENCES cvs(id),
-                UNIQUE(job_id, user_id)
-            )
-        """)
+def _run_timed(submitted_at: float, fn, args, kwargs):
+    started = time.perf_counter()
+    wait_ms = (started - submitted_at) * 1000
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        with _db_metrics_lock:
+            db_metrics["queue_wait_ms_total"] += wait_ms
+            db_metrics["queue_wait_ms_max"] = max(db_metrics["queue_wait_ms_max"], wait_ms)
+            db_metrics["run_ms_total"] += (time.perf_counter() - started) * 1000
 
-        # Messages tablosu (mesajlaşma sistemi)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender_id INTEGER NOT NULL,
-                receiver_id INTEGER NOT NULL,
-                application_id INTEGER,
-                content TEXT NOT NULL,
-                is_read INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (sender_id) REFERENCES users(id),
-                FOREIGN KEY (receiver_id) REFERENCES users(id),
-                FOREIGN KEY (application_id) REFERENCES applications(id)
-            )
-        """)
 
-        # Conversations tablosu (sohbet listesi için)
+async def run_db(fn, *args, **kwargs):
+    """fn'i veritabani havuzunda calistirir ve sonucunu bekler"""
+    global _db_slots
+    if _db_slots is None:
+        _db_slots = asyncio.Semaphore(DB_QUEUE_MAX)
+
+    try:
+        await asyncio.wait_for(_db_slots.acquire(), timeout=DB_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        db_metrics["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Sunucu yogun, lutfen tekrar deneyin",
+            headers={"Retry-After": "1"},
+        )
+
+    db_metrics["submitted"] += 1
+    db_metrics["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            db_executor, _run_timed, time.perf_counter(), fn, args, kwargs
+        )
+    finally:
+        db_metrics["in_flight"] -= 1
+        _db_slots.release()
+
+
+def db_handler(handler):
+    """Senkron (yalnizca DB isi yapan) endpoint'i veritabani havuzunda calisan async endpoint'e cevirir"""
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        return await run_db(handler, *args, **kwargs)
+    return wrapper
+
+
+def normalize_search_text(text: str) -> str:
+    """Arama icin Turkce harfleri sadelestirir (İ/I/ı -> i, ş -> s, ç -> c ...)"""
+    text = text.replace("İ", "i").replace("I", "i").replace("ı", "i").lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize_filter_value(value: Optional[str]) -> Optional[str]:
+    """Sirket/konum degerini filtre karsilastirmasi icin sadelestirir"""
+    if value is None:
+        return None
+    return " ".join(normalize_search_text(value).split())
+
+
+# ---- Sema migration'lari ----
+# Her migration bir kez, sirayla ve kendi transaction'inda calisir; uygulananlar
+# schema_version tablosuna yazilir. Migration'lar surumsuz eski veritabanlarinda
+# da guvenle calisabilmek icin idempotent yazilir (IF NOT EXISTS, add_column).
+
+def add_column(cursor, table: str, column: str, definition: str):
+    """Kolon yoksa ekler"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [r["name"] for r in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def migration_initial_schema(cursor):
+    # Users tablosu
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('employer', 'jobseeker')),
+            full_name TEXT,
+            phone TEXT,
+            bio TEXT,
+            location TEXT,
+            company_name TEXT,
+            website TEXT,
+            linkedin TEXT,
+            skills TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Profil kolonlari sonradan eklendigi icin eski veritabanlarinda eksik olabilir
+    for column in ["full_name", "phone", "bio", "location", "company_name", "website", "linkedin", "skills"]:
+        add_column(cursor, "users", column, "TEXT")
+
+    # CVs tablosu
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cvs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            text_content TEXT NOT NULL,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+
+    # Jobs tablosu
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employer_id INTEGER,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (employer_id) REFERENCES users(id)
+        )
+    """)
+
+    # Match history tablosu
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS match_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            cv_id INTEGER NOT NULL,
+            job_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            matched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (cv_id) REFERENCES cvs(id),
+            FOREIGN KEY (job_id) REFERENCES jobs(id),
+            UNIQUE(user_id, cv_id, job_id)
+        )
+    """)
+
+    # Applications tablosu
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS applications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            cv_id INTEGER,
+            cover_letter TEXT,
+            status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'reviewed', 'accepted', 'rejected')),
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (job_id) REFERENCES jobs(id),
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (cv_id) REFERENCES cvs(id),
+            UNIQUE(job_id, user_id)
+        )
+    """)
+
+    # Messages tablosu (mesajlaşma sistemi)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER NOT NULL,
+            receiver_id INTEGER NOT NULL,
+            application_id INTEGER,
+            content TEXT NOT NULL,
+            is_read INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sender_id) REFERENCES users(id),
+            FOREIGN KEY (receiver_id) REFERENCES users(id),
+            FOREIGN KEY (application_id) REFERENCES applications(id)
+        )
+    """)
+
+    # Conversations tablosu (sohbet listesi için)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user1_id INTEGER NOT NULL,
+            user2_id INTEGER NOT NULL,
+            application_id INTEGER,
+            last_message_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user1_id) REFERENCES users(id),
+            FOREIGN KEY (user2_id) REFERENCES users(id),
+            FOREIGN KEY (application_id) REFERENCES applications(id),
+            UNIQUE(user1_id, user2_id, application_id)
+        )
+    """)
+
+
+def migration_embeddings(cursor):
+    # Embedding kolonlari (float32 BLOB) - vektor indeksi icin
+    add_column(cursor, "jobs", "embedding", "BLOB")
+    add_column(cursor, "cvs", "embedding", "BLOB")
+
+
+def migration_match_filter_indexes(cursor):
+    # /matches filtreleri icin indeksler
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_company ON users(company_name COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_location ON users(location COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_user ON applications(user_id, job_id)")
+
+
+def migration_candidate_search(cursor):
+    add_column(cursor, "users", "open_to_work", "INTEGER DEFAULT 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cvs_user ON cvs(user_id, id)")
+
+
+def migration_application_match_score(cursor):
+    # Basvuru eslesme skoru (CV ve ilan embedding'lerinden, bir kez hesaplanir)
+    add_column(cursor, "applications", "match_score", "REAL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_job_score ON applications(job_id, match_score DESC, id DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_job_date ON applications(job_id, applied_at DESC, id DESC)")
+
+
+def migration_jobs_fts(cursor):
+    # Is ilanlari tam metin arama indeksi (FTS5). Turkce "ı" harfi tokenizer
+    # tarafindan "i"ye indirgenmedigi icin indekse katlanmis hali yazilir; bu kopya
+    # yalnizca MATCH icindir, gosterilen kesit jobs.description'dan uretilir.
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+            title, description,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_insert AFTER INSERT ON jobs BEGIN
+            INSERT INTO jobs_fts (rowid, title, description)
+            VALUES (new.id, replace(new.title, 'ı', 'i'), replace(new.description, 'ı', 'i'));
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_update AFTER UPDATE OF title, description ON jobs BEGIN
+            DELETE FROM jobs_fts WHERE rowid = old.id;
+            INSERT INTO jobs_fts (rowid, title, description)
+            VALUES (new.id, replace(new.title, 'ı', 'i'), replace(new.description, 'ı', 'i'));
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_delete AFTER DELETE ON jobs BEGIN
+            DELETE FROM jobs_fts WHERE rowid = old.id;
+        END
+    """)
+    # Mevcut ilanlar icin indeks bir kez doldurulur
+    cursor.execute("DELETE FROM jobs_fts")
+    cursor.execute("""
+        INSERT INTO jobs_fts (rowid, title, description)
+        SELECT id, replace(title, 'ı', 'i'), replace(description, 'ı', 'i') FROM jobs
+    """)
+
+
+def migration_jobs_created_index(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at DESC, id DESC)")
+
+
+def migration_hot_path_indexes(cursor):
+    # Son CV: cvs WHERE user_id ORDER BY uploaded_at
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cvs_user_uploaded ON cvs(user_id, uploaded_at DESC)")
+    # Isverenin ilanlari: jobs WHERE employer_id ORDER BY created_at
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_employer ON jobs(employer_id, created_at DESC)")
+    # Okunmamis mesajlar ve alici tarafli sohbet sorgulari
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_receiver ON messages(receiver_id, is_read, sender_id)")
+    # Iki kullanici arasindaki mesajlar (gonderen/alici cifti)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_pair ON messages(sender_id, receiver_id, created_at)")
+
+
+def migration_conversation_summaries(cursor):
+    # Sohbet listesi okuma modeli: son mesaj ve taraf basina okunmamis sayac
+    add_column(cursor, "conversations", "last_message", "TEXT")
+    add_column(cursor, "conversations", "last_message_id", "INTEGER")
+    add_column(cursor, "conversations", "user1_unread", "INTEGER DEFAULT 0")
+    add_column(cursor, "conversations", "user2_unread", "INTEGER DEFAULT 0")
+
+    # UNIQUE(user1_id, user2_id, application_id) NULL basvurularda calismadigi
+    # icin tekrar eden satirlar olusmustu; tablo mesajlardan yeniden kurulur.
+    # MAX(id) ile secilen bare kolonlar (content, created_at) ayni satirdan gelir.
+    cursor.execute("DELETE FROM conversations")
+    cursor.execute("""
+        INSERT INTO conversations (user1_id, user2_id, application_id, last_message,
+                                   last_message_id, last_message_at, user1_unread, user2_unread)
+        SELECT MIN(sender_id, receiver_id) as u1, MAX(sender_id, receiver_id) as u2, application_id,
+               content, MAX(id), created_at,
+               SUM(is_read = 0 AND receiver_id = MIN(sender_id, receiver_id)),
+               SUM(is_read = 0 AND receiver_id = MAX(sender_id, receiver_id))
+        FROM messages
+        GROUP BY u1, u2, application_id
+    """)
+
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_conversations_key
+        ON conversations(user1_id, user2_id, IFNULL(application_id, 0))
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_user1 ON conversations(user1_id, last_message_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_user2 ON conversations(user2_id, last_message_at DESC)")
+
+
+def migration_message_history_cursor(cursor):
+    # Mesaj gecmisi id imleciyle sayfalanir: (gonderen, alici) icinde id sirali tarama
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages(sender_id, receiver_id, id)")
+
+
+def migration_event_outbox(cursor):
+    # Coklu worker olay dagitimi icin SQLite outbox (EVENT_FANOUT=sqlite)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS event_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_event_outbox_created ON event_outbox(created_at)")
+
+
+def migration_user_unread(cursor):
+    # Kullanici basina okunmamis mesaj sayaci (/unread-count COUNT(*) yerine)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_unread (
+            user_id INTEGER PRIMARY KEY,
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+    cursor.execute("DELETE FROM user_unread")
+    cursor.execute("""
+        INSERT INTO user_unread (user_id, unread_count)
+        SELECT receiver_id, COUNT(*) FROM messages WHERE is_read = 0 GROUP BY receiver_id
+    """)
+
+
+def migration_user_stats(cursor):
+    # Panel istatistikleri icin onceden hesaplanmis sayaclar
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            job_count INTEGER NOT NULL DEFAULT 0,
+            received_application_count INTEGER NOT NULL DEFAULT 0,
+            cv_count INTEGER NOT NULL DEFAULT 0,
+            match_count INTEGER NOT NULL DEFAULT 0,
+            application_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+    add_column(cursor, "jobs", "application_count", "INTEGER NOT NULL DEFAULT 0")
+
+    cursor.execute("UPDATE jobs SET application_count = (SELECT COUNT(*) FROM applications WHERE job_id = jobs.id)")
+    cursor.execute("DELETE FROM user_stats")
+    cursor.execute("""
+        INSERT INTO user_stats (user_id, job_count, received_application_count,
+                                cv_count, match_count, application_count)
+        SELECT u.id,
+               (SELECT COUNT(*) FROM jobs WHERE employer_id = u.id),
+               (SELECT COALESCE(SUM(application_count), 0) FROM jobs WHERE employer_id = u.id),
+               (SELECT COUNT(*) FROM cvs WHERE user_id = u.id),
+               (SELECT COUNT(*) FROM match_history WHERE user_id = u.id),
+               (SELECT COUNT(*) FROM applications WHERE user_id = u.id)
+        FROM users u
+    """)
+
+
+def migration_recommendations(cursor):
+    # CV basina onceden hesaplanmis en iyi K ilan (arka plan onericisi doldurur)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recommendations (
+            cv_id INTEGER NOT NULL,
+            job_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (cv_id, job_id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recommendations_cv_score ON recommendations(cv_id, score DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recommendations_job ON recommendations(job_id)")
+    # kth_score: listedeki en dusuk skor (liste dolu degilse -1); yeni ilan bu esigi gecerse listeye girer
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recommendation_state (
+            cv_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            kth_score REAL NOT NULL DEFAULT -1,
+            refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recommendation_state_user ON recommendation_state(user_id)")
+    # Onericinin islemis oldugu en buyuk ilan id'si; sunucu disinda eklenen ilanlar acilista islenir
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recommendation_sync (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            job_watermark INTEGER NOT NULL DEFAULT 0,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def migration_notifications(cursor):
+    # Kullanici bildirimleri (orn. yeni ilan uyarisi); ayni ilan icin tek bildirim
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            job_id INTEGER,
+            score REAL,
+            is_read INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_job ON notifications(user_id, type, job_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_job_id ON notifications(job_id)")
+
+
+def migration_users_search_columns(cursor):
+    # Sirket/konum filtreleri icin sadelestirilmis kopyalar (COLLATE NOCASE yalnizca
+    # ASCII katlar; "istanbul" aramasi "İstanbul" ile eslesmez)
+    add_column(cursor, "users", "company_name_norm", "TEXT")
+    add_column(cursor, "users", "location_norm", "TEXT")
+    cursor.execute("SELECT id, company_name, location FROM users WHERE company_name IS NOT NULL OR location IS NOT NULL")
+    cursor.executemany(
+        "UPDATE users SET company_name_norm = ?, location_norm = ? WHERE id = ?",
+        [
+            (normalize_filter_value(r["company_name"]), normalize_filter_value(r["location"]), r["id"])
+            for r in cursor.fetchall()
+        ],
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_users_company")
+    cursor.execute("DROP INDEX IF EXISTS idx_users_location")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_company_norm ON users(company_name_norm, role)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_location_norm ON users(location_norm, role)")
+
+
+MIGRATIONS = [
+    (1, "initial_schema", migration_initial_schema),
+    (2, "embeddings", migration_embeddings),
+    (3, "match_filter_indexes", migration_match_filter_indexes),
+    (4, "candidate_search", migration_candidate_search),
+    (5, "application_match_score", migration_application_match_score),
+    (6, "jobs_fts", migration_jobs_fts),
+    (7, "jobs_created_index", migration_jobs_created_index),
+    (8, "hot_path_indexes", migration_hot_path_indexes),
+    (9, "conversation_summaries", migration_conversation_summaries),
+    (10, "message_history_cursor", migration_message_history_cursor),
+    (11, "event_outbox", migration_event_outbox),
+    (12, "user_unread", migration_user_unread),
+    (13, "user_stats", migration_user_stats),
+    (14, "recommendations", migration_recommendations),
+    (15, "notifications", migration_notifications),
+    (16, "users_search_columns", migration_users_search_columns),
+]
+
+
+def init_db():
+    """Veritabanini olusturur ve bekleyen migration'lari uygular"""
+    with get_db(write=True) as conn:
+        cursor = conn.cursor()
+
+        # WAL: okuyucular yazicilari, yazicilar okuyuculari bloklamaz (kalici ayar)
+        cursor.execute("PRAGMA journal_mode = WAL")
+
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user1_id INTEGER NOT NULL,
-                user2_id INTEGER NOT NULL,
-                application_id INTEGER,
-                last_message_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user1_id) REFERENCES users(id),
-                FOREIGN KEY (user2_id) REFERENCES users(id),
-                FOREIGN KEY (application_id) REFERENCES applications(id),
-                UNIQUE(user1_id, user2_id, application_id)
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) as version FROM schema_version")
+        current = cursor.fetchone()["version"]
+
+        for version, name, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            try:
+                cursor.execute("BEGIN")
+                migrate(cursor)
+                cursor.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                print(f"Migration hatasi: {version} {name}")
+                raise
+            print(f"Migration uygulandi: {version} {name}")
 
-        conn.commit()
         print("Veritabani tablolari olusturuldu!")
 
 
@@ -592,6 +1163,7 @@ class ProfileUpdate(BaseModel):
     website: Optional[str] = None
     linkedin: Optional[str] = None
     skills: Optional[str] = None  # jobseeker only - comma separated
+    open_to_work: Optional[bool] = None  # jobseeker only - isveren aramalarinda gorunur
 
 class ApplicationCreate(BaseModel):
     job_id: int
@@ -601,56 +1173,780 @@ class ApplicationCreate(BaseModel):
 class ApplicationStatusUpdate(BaseModel):
     status: str  # pending, reviewed, accepted, rejected
 
+class BatchMatchRequest(BaseModel):
+    cv_ids: list[int]
+    top_k: int = 10
+
 class MessageCreate(BaseModel):
     receiver_id: int
     content: str
     application_id: Optional[int] = None
 
 
+class MarkReadRequest(BaseModel):
+    up_to_id: int
+
+
+class NotificationsReadRequest(BaseModel):
+    up_to_id: Optional[int] = None  # verilmezse tum bildirimler
+
+
 # ============================================================
 # HELPER FONKSIYONLAR
 # ============================================================
 
+# Eski (uid icermeyen) token'lar icin email -> user_id onbellegi
+user_ids_by_email = LRUCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+
 def get_user_id_from_token(token_payload: dict) -> int:
     """Token'dan user_id cikarir"""
+    user_id = token_payload.get("uid")
+    if user_id is not None:
+        return user_id
+
     email = token_payload.get("sub")
     if not email:
         raise HTTPException(status_code=401, detail="Gecersiz token")
 
+    user_id = user_ids_by_email.get(email)
+    if user_id is not None:
+        return user_id
+
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE email=?", (email,))
+        cursor.execute(USER_BY_EMAIL_SQL, (email,))
         result = cursor.fetchone()
 
     if not result:
         raise HTTPException(status_code=404, detail="Kullanici bulunamadi")
 
+    user_ids_by_email.set(email, result["id"])
     return result["id"]
 
 
-def load_jobs_from_db():
-    """Tum is ilanlarini embedding'leriyle birlikte yukler"""
+USER_STAT_COLUMNS = ("job_count", "received_application_count", "cv_count", "match_count", "application_count")
+
+
+def bump_user_stats(cursor, user_id: int, **deltas):
+    """user_stats sayaclarini cagiranin transaction'i icinde degistirir (orn. cv_count=1)"""
+    columns = [c for c, delta in deltas.items() if delta]
+    if not columns:
+        return
+    if any(c not in USER_STAT_COLUMNS for c in columns):
+        raise ValueError(f"Bilinmeyen istatistik kolonu: {columns}")
+
+    values = [deltas[c] for c in columns]
+    cursor.execute(f"""
+        INSERT INTO user_stats (user_id, {", ".join(columns)})
+        VALUES (?, {", ".join("MAX(?, 0)" for _ in columns)})
+        ON CONFLICT(user_id) DO UPDATE SET {", ".join(f"{c} = MAX({c} + ?, 0)" for c in columns)}
+    """, (user_id, *values, *values))
+
+
+def search_terms(search: str) -> list:
+    """Aramayi sadelestirilmis kelimelere ayirir"""
+    return re.findall(r"\w+", normalize_search_text(search))
+
+
+def build_fts_query(search: str) -> Optional[str]:
+    """Kullanici aramasini FTS5 on-ek sorgusuna cevirir ("pyth dev" -> "pyth"* "dev"*)"""
+    terms = search_terms(search)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def build_snippet(text: str, terms: list, size: int = 24) -> str:
+    """Metnin aranan kelimeleri en cok iceren `size` kelimelik kesitini dondurur.
+
+    FTS indeksi sadelestirilmis metni tuttugu icin kesit orijinal metinden uretilir:
+    metin HTML-escape edilir, eslesen kelimeler <mark> ile isaretlenir.
+    """
+    words = list(re.finditer(r"\w+", text))
+    if not words:
+        return html.escape(text)
+    hits = [i for i, w in enumerate(words) if normalize_search_text(w.group()).startswith(tuple(terms))]
+
+    # En cok eslesme iceren pencere (eslesme yoksa metnin basi)
+    start = 0
+    best = 0
+    for i in hits:
+        window_start = max(0, min(i, len(words) - size))
+        count = sum(1 for h in hits if window_start <= h < window_start + size)
+        if count > best:
+            start, best = window_start, count
+    end = min(start + size, len(words))
+
+    hit_set = set(hits)
+    parts = ["..." if start > 0 else ""]
+    position = words[start].start()
+    for i in range(start, end):
+        word = words[i]
+        parts.append(html.escape(text[position:word.start()]))
+        if i in hit_set:
+            parts.append(f"<mark>{html.escape(word.group())}</mark>")
+        else:
+            parts.append(html.escape(word.group()))
+        position = word.end()
+    parts.append("..." if end < len(words) else html.escape(text[position:]))
+    return "".join(parts)
+
+
+USER_BY_EMAIL_SQL = "SELECT id FROM users WHERE email=?"
+
+
+def encode_cursor(values: list) -> str:
+    """Keyset sayfalama degerlerini opak bir cursor'a cevirir"""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+CURSOR_NUMBER = (int, float)
+
+
+def decode_cursor(token: str, types: tuple) -> list:
+    """
+    encode_cursor ile uretilen cursor'u cozer.
+    types her eleman icin beklenen tipleri verir; uymayan cursor 400 doner.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except Exception:
+        values = None
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Gecersiz cursor")
+    for value, expected in zip(values, types):
+        # bool int'in alt sinifi oldugu icin ayrica reddedilir
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise HTTPException(status_code=400, detail="Gecersiz cursor")
+    return values
+
+
+# ============================================================
+# VEKTOR INDEKSI
+# ============================================================
+
+EMBEDDING_DIM = 384
+
+IndexSnapshot = namedtuple("IndexSnapshot", ["ids", "matrix", "meta", "alive", "generation"])
+
+
+def encode_texts(texts: list) -> np.ndarray:
+    """Metinleri normalize edilmis float32 embedding matrisine cevirir"""
     if model is None:
         raise HTTPException(status_code=500, detail="Model yuklenemedi")
+    vectors = model.encode(texts, batch_size=64, normalize_embeddings=True)
+    return np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+
+
+def embedding_to_blob(vector) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def blob_to_embedding(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class VectorIndex:
+    """Bellek ici embedding indeksi.
+
+    Satirlar yalnizca sona eklenir; guncellenen/silinen kayitlar "olu" olarak
+    isaretlenir ve olu oran artinca matris sikistirilir. Boylece snapshot alan
+    okuyucular kilit tutmadan skor hesaplayabilir.
+    """
+
+    def __init__(self, meta_fields: dict, dim: int = EMBEDDING_DIM):
+        self._lock = threading.Lock()
+        self._meta_fields = meta_fields
+        self.dim = dim
+        self._size = 0
+        self._dead = 0
+        self._rows = {}
+        self._allocate(16)
+        self.generation = 0
+        self.loaded = False
+
+    def _allocate(self, capacity: int):
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._meta = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self._meta_fields.items()}
+
+    def _copy_rows(self, rows: np.ndarray, capacity: int):
+        ids, matrix, alive, meta = self._ids, self._matrix, self._alive, self._meta
+        self._allocate(capacity)
+        n = len(rows)
+        self._ids[:n] = ids[rows]
+        self._matrix[:n] = matrix[rows]
+        self._alive[:n] = alive[rows]
+        for name in self._meta:
+            self._meta[name][:n] = meta[name][rows]
+        self._size = n
+
+    def _maybe_compact(self):
+        if self._dead > 1024 and self._dead * 4 > self._size:
+            live = np.flatnonzero(self._alive[:self._size])
+            self._copy_rows(live, max(16, len(live) * 2))
+            self._rows = {int(item_id): row for row, item_id in enumerate(self._ids[:self._size])}
+            self._dead = 0
+
+    def load(self, ids, matrix, meta: dict):
+        """Indeksi verilen kayitlarla bastan olusturur"""
+        with self._lock:
+            n = len(ids)
+            self._allocate(max(16, n))
+            if n:
+                self._ids[:n] = ids
+                self._matrix[:n] = matrix
+                self._alive[:n] = True
+                for name in self._meta:
+                    self._meta[name][:n] = meta[name]
+            self._size = n
+            self._dead = 0
+            self._rows = {int(item_id): row for row, item_id in enumerate(ids)}
+            self.generation += 1
+            self.loaded = True
+
+    def upsert(self, item_id: int, vector, **meta):
+        with self._lock:
+            old_row = self._rows.get(item_id)
+            if old_row is not None:
+                self._alive[old_row] = False
+                self._dead += 1
+            if self._size == len(self._ids):
+                self._copy_rows(np.arange(self._size), len(self._ids) * 2)
+            row = self._size
+            self._ids[row] = item_id
+            self._matrix[row] = vector
+            for name in self._meta:
+                self._meta[name][row] = meta.get(name, 0)
+            self._alive[row] = True
+            self._size += 1
+            self._rows[item_id] = row
+            self.generation += 1
+            self._maybe_compact()
+
+    def remove(self, item_id: int) -> bool:
+        with self._lock:
+            row = self._rows.pop(item_id, None)
+            if row is None:
+                return False
+            self._alive[row] = False
+            self._dead += 1
+            self.generation += 1
+            self._maybe_compact()
+            return True
+
+    def set_meta(self, item_id: int, **meta) -> bool:
+        """Kaydin meta degerlerini yerinde gunceller (vektor ve generation degismez)"""
+        with self._lock:
+            row = self._rows.get(item_id)
+            if row is None:
+                return False
+            for name, value in meta.items():
+                self._meta[name][row] = value
+            return True
+
+    def get(self, item_id: int):
+        """Kaydin vektorunu ve meta bilgilerini dondurur (yoksa None)"""
+        with self._lock:
+            row = self._rows.get(item_id)
+            if row is None:
+                return None
+            return (
+                self._matrix[row].copy(),
+                {name: self._meta[name][row].item() for name in self._meta},
+            )
 
-    with get_db() as conn:
+    def snapshot(self) -> IndexSnapshot:
+        with self._lock:
+            n = self._size
+            return IndexSnapshot(
+                self._ids[:n],
+                self._matrix[:n],
+                {name: values[:n] for name, values in self._meta.items()},
+                self._alive[:n],
+                self.generation,
+            )
+
+    def __len__(self):
+        return len(self._rows)
+
+
+def top_k_search(snapshot: IndexSnapshot, queries, k: int, mask=None, row_block: int = 256, col_block: int = 65536):
+    """Her sorgu vektoru icin en yuksek skorlu k kaydi (ids, scores) olarak uretir.
+
+    Skor matrisi (row_block x col_block) parcalar halinde hesaplanir, boylece
+    buyuk sorgu/indeks boyutlarinda bellek kullanimi sinirli kalir. Maske
+    verilirse yalnizca secili satirlar skorlanir.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    candidates = snapshot.alive if mask is None else (snapshot.alive & mask)
+    rows = np.flatnonzero(candidates)
+    contiguous = len(rows) == len(snapshot.ids)
+
+    for r0 in range(0, len(queries), row_block):
+        query_block = queries[r0:r0 + row_block]
+        best_scores = np.empty((len(query_block), 0), dtype=np.float32)
+        best_rows = np.empty((len(query_block), 0), dtype=np.int64)
+
+        if k > 0:
+            for c0 in range(0, len(rows), col_block):
+                block_rows = rows[c0:c0 + col_block]
+                block = snapshot.matrix[c0:c0 + col_block] if contiguous else snapshot.matrix[block_rows]
+                scores = query_block @ block.T
+                kk = min(k, scores.shape[1])
+                part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+                best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+                best_rows = np.concatenate([best_rows, block_rows[part]], axis=1)
+                if best_scores.shape[1] > k:
+                    part = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                    best_scores = np.take_along_axis(best_scores, part, axis=1)
+                    best_rows = np.take_along_axis(best_rows, part, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        for i in range(len(query_block)):
+            yield snapshot.ids[best_rows[i]], best_scores[i]
+
+
+# Is ilanlari indeksi (employer filtresi ve ilan yasi icin meta kolonlariyla)
+job_index = VectorIndex({"employer_id": np.int64, "created_ts": np.int64})
+_job_index_load_lock = threading.Lock()
+
+
+def get_job_index() -> VectorIndex:
+    """Is ilani indeksini (gerekirse ilk kullanimda) yukler"""
+    if not job_index.loaded:
+        with _job_index_load_lock:
+            if not job_index.loaded:
+                load_job_index()
+    return job_index
+
+
+def load_job_index():
+    """Tum is ilanlarini DB'deki embedding'leriyle indekse yukler, eksikleri hesaplar"""
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id, title, description FROM jobs ORDER BY id ASC")
+        cursor.execute("""
+            SELECT id, employer_id, title, description, embedding,
+                   CAST(strftime('%s', created_at) AS INTEGER) as created_ts
+            FROM jobs ORDER BY id ASC
+        """)
         rows = cursor.fetchall()
 
-    jobs = []
+        matrix = embedding_matrix(cursor, "jobs", rows, lambda r: r["title"] + " " + r["description"])
+        conn.commit()
+
+    job_index.load(
+        np.array([r["id"] for r in rows], dtype=np.int64),
+        matrix,
+        {
+            "employer_id": np.array([r["employer_id"] or 0 for r in rows], dtype=np.int64),
+            "created_ts": np.array([r["created_ts"] or 0 for r in rows], dtype=np.int64),
+        },
+    )
+
+
+def embedding_matrix(cursor, table: str, rows, text_of) -> np.ndarray:
+    """Satirlarin embedding'lerini matris olarak dondurur; eksik olanlari toplu hesaplayip tabloya yazar"""
+    matrix = np.zeros((len(rows), EMBEDDING_DIM), dtype=np.float32)
+    missing = []
+    for i, r in enumerate(rows):
+        if r["embedding"] is None:
+            missing.append(i)
+        else:
+            matrix[i] = blob_to_embedding(r["embedding"])
+
+    for c0 in range(0, len(missing), 256):
+        chunk = missing[c0:c0 + 256]
+        vectors = encode_texts([text_of(rows[i]) for i in chunk])
+        for i, vector in zip(chunk, vectors):
+            matrix[i] = vector
+            cursor.execute(f"UPDATE {table} SET embedding=? WHERE id=?", (embedding_to_blob(vector), rows[i]["id"]))
+
+    return matrix
+
+
+def encode_job(title: str, description: str):
+    """Ilanin embedding'ini hesaplar (model yoksa None).
+
+    Yazma transaction'i acilmadan once cagrilir; model cikarimi suresince SQLite'in
+    tek yazici kilidi tutulmaz.
+    """
+    if model is None:
+        return None
+    return encode_texts([title + " " + description])[0]
+
+
+# Aday indeksi: her is arayanin en son CV'si (id = user_id).
+# rec_threshold: CV'nin oneri listesindeki en dusuk skor (bkz. Recommender)
+RECOMMENDATION_NO_THRESHOLD = -1.0
+cv_index = VectorIndex({"cv_id": np.int64, "open_to_work": np.bool_, "rec_threshold": np.float32})
+_cv_index_load_lock = threading.Lock()
+
+
+def get_cv_index() -> VectorIndex:
+    """Aday (CV) indeksini gerekirse ilk kullanimda yukler"""
+    if not cv_index.loaded:
+        with _cv_index_load_lock:
+            if not cv_index.loaded:
+                load_cv_index()
+    return cv_index
+
+
+def load_cv_index():
+    """Her is arayanin en son CV'sini embedding'iyle indekse yukler"""
+    with get_db(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT c.id, c.user_id, c.text_content, c.embedding, u.open_to_work,
+                   COALESCE(s.kth_score, ?) as rec_threshold
+            FROM (SELECT MAX(id) as id FROM cvs GROUP BY user_id) latest
+            JOIN cvs c ON c.id = latest.id
+            JOIN users u ON u.id = c.user_id
+            LEFT JOIN recommendation_state s ON s.cv_id = c.id
+            WHERE u.role = 'jobseeker'
+            ORDER BY c.user_id ASC
+        """, (RECOMMENDATION_NO_THRESHOLD,))
+        rows = cursor.fetchall()
+        matrix = embedding_matrix(cursor, "cvs", rows, lambda r: r["text_content"])
+        conn.commit()
+
+    cv_index.load(
+        np.array([r["user_id"] for r in rows], dtype=np.int64),
+        matrix,
+        {
+            "cv_id": np.array([r["id"] for r in rows], dtype=np.int64),
+            "open_to_work": np.array([bool(r["open_to_work"]) for r in rows], dtype=np.bool_),
+            "rec_threshold": np.array([r["rec_threshold"] for r in rows], dtype=np.float32),
+        },
+    )
+
+
+def get_cv_embedding(cursor, cv_row) -> np.ndarray:
+    """CV embedding'ini DB'den okur; yoksa hesaplayip kaydeder"""
+    if cv_row["embedding"] is not None:
+        return blob_to_embedding(cv_row["embedding"])
+    vector = encode_texts([cv_row["text_content"]])[0]
+    cursor.execute("UPDATE cvs SET embedding=? WHERE id=?", (embedding_to_blob(vector), cv_row["id"]))
+    return vector
+
+
+def score_applications(cursor, job_id: int, application_ids: Optional[list] = None):
+    """Skoru hesaplanmamis basvurularin eslesme skorunu saklanan embedding'lerden doldurur"""
+    query = """
+        SELECT a.id, a.cv_id, c.embedding,
+               CASE WHEN c.embedding IS NULL THEN c.text_content END as text_content
+        FROM applications a
+        LEFT JOIN cvs c ON a.cv_id = c.id
+        WHERE a.job_id = ? AND a.match_score IS NULL
+    """
+    params = [job_id]
+    if application_ids:
+        query += f" AND a.id IN ({','.join('?' * len(application_ids))})"
+        params += application_ids
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    if not rows:
+        return
+
+    entry = get_job_index().get(job_id)
+    if entry is None:
+        return
+    job_vector = entry[0]
+
     for r in rows:
-        full_text = r["title"] + " " + r["description"]
-        embedding = model.encode(full_text, normalize_embeddings=True)
+        if r["cv_id"] is None or (r["embedding"] is None and r["text_content"] is None):
+            score = 0.0
+        else:
+            cv_row = {"id": r["cv_id"], "embedding": r["embedding"], "text_content": r["text_content"]}
+            score = round(max(float(np.dot(get_cv_embedding(cursor, cv_row), job_vector)), 0) * 100, 1)
+        cursor.execute("UPDATE applications SET match_score = ? WHERE id = ?", (score, r["id"]))
+
+
+def build_job_filter_mask(
+    snapshot: IndexSnapshot,
+    cursor,
+    user_id: int,
+    employer_id: Optional[int] = None,
+    company: Optional[str] = None,
+    location: Optional[str] = None,
+    max_age_days: Optional[int] = None,
+    exclude_applied: bool = False,
+):
+    """Filtreleri indeks satirlari uzerinde boolean maskeye cevirir (filtre yoksa None).
 
-        jobs.append({
-            "id": r["id"],
-            "title": r["title"],
-            "description": r["description"],
-            "embedding": embedding,
-        })
+    Sirket ve konum isverenin users kaydinda tutuldugu icin once indeksli SQL
+    ile isveren id kumesine indirgenir.
+    """
+    mask = None
+
+    def narrow(current, condition):
+        return condition if current is None else (current & condition)
+
+    employer_ids = snapshot.meta["employer_id"]
+
+    if employer_id is not None:
+        mask = narrow(mask, employer_ids == employer_id)
+
+    if company:
+        cursor.execute(
+            "SELECT id FROM users WHERE company_name_norm = ? AND role = 'employer'",
+            (normalize_filter_value(company),)
+        )
+        mask = narrow(mask, np.isin(employer_ids, [r["id"] for r in cursor.fetchall()]))
 
-    return jobs
+    if location:
+        cursor.execute(
+            "SELECT id FROM users WHERE location_norm = ? AND role = 'employer'",
+            (normalize_filter_value(location),)
+        )
+        mask = narrow(mask, np.isin(employer_ids, [r["id"] for r in cursor.fetchall()]))
+
+    if max_age_days is not None:
+        min_ts = int(time.time()) - max_age_days * 86400
+        mask = narrow(mask, snapshot.meta["created_ts"] >= min_ts)
+
+    if exclude_applied:
+        cursor.execute("SELECT job_id FROM applications WHERE user_id = ?", (user_id,))
+        applied = [r["job_id"] for r in cursor.fetchall()]
+        if applied:
+            mask = narrow(mask, ~np.isin(snapshot.ids, applied))
+
+    return mask
+
+
+# ---- Onerilen ilanlar (materialize) ----
+# Her is arayanin en son CV'si icin en iyi RECOMMENDATION_K ilan recommendations
+# tablosunda tutulur; filtresiz /matches buradan okunur. Tablo arka planda
+# artimsal guncellenir:
+#   - yeni/degisen CV: yalnizca o CV ilan indeksine karsi skorlanir
+#   - yeni/degisen ilan: ilan vektoru tum CV matrisiyle tek carpimda skorlanir ve
+#     skoru CV'nin esigini (listedeki en dusuk skor) gecenlerin listesine eklenir
+#   - silinen/degisen ilan: onu listesinde tasiyan CV'ler bastan skorlanir
+RECOMMENDATION_K = int(os.getenv("RECOMMENDATION_K", 50))
+RECOMMENDATION_BLOCK = 256
+
+
+class Recommender:
+    """recommendations tablosunu CV ve ilan degisikliklerine gore guncel tutar"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self.pending_users = set()
+        self.pending_jobs = OrderedDict()  # islenme sirasi korunur, tekrar eklenen ilan birlesir
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.refreshed_cvs = 0
+        self.merged_jobs = 0
+        self.synced_at = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="recommender", daemon=True)
+        self.thread.start()
+
+    def cv_changed(self, user_id: int):
+        # Thread calismiyorsa (model yok) is biriktirilmez
+        if self.thread is None:
+            return
+        with self.lock:
+            self.pending_users.add(user_id)
+        self.wakeup.set()
+
+    def job_changed(self, job_id: int):
+        if self.thread is None:
+            return
+        with self.lock:
+            self.pending_jobs[job_id] = None
+        self.wakeup.set()
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.pending_users) + len(self.pending_jobs)
+
+    def _run(self):
+        try:
+            get_job_index()
+            get_cv_index()
+            self.backfill()
+        except Exception as e:
+            print(f"Oneri tablosu doldurulamadi: {e}")
+
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            max_job_id = self.max_job_id()
+            with self.lock:
+                users, self.pending_users = self.pending_users, set()
+                jobs, self.pending_jobs = list(self.pending_jobs), OrderedDict()
+            try:
+                for job_id in jobs:
+                    users |= self.merge_job(job_id)
+                self.refresh(sorted(users))
+                # Kuyruk bosaldiysa tablo, okunan en buyuk ilan id'sine kadar gunceldir
+                if not self.pending():
+                    self.mark_synced(max_job_id)
+            except Exception as e:
+                print(f"Oneri tablosu guncellenemedi: {e}")
+
+    def max_job_id(self) -> int:
+        with get_db() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) as id FROM jobs").fetchone()["id"]
+
+    def mark_synced(self, job_watermark: int):
+        with get_db(write=True) as conn:
+            conn.execute("""
+                INSERT INTO recommendation_sync (id, job_watermark, synced_at) VALUES (1, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(id) DO UPDATE SET job_watermark = excluded.job_watermark, synced_at = excluded.synced_at
+            """, (job_watermark,))
+            conn.commit()
+        self.synced_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+    def backfill(self):
+        """Acilista tabloyu gunceller: listesi olmayan CV'ler bastan skorlanir, sunucu
+        disinda (orn. seed_jobs.py) eklenen/silinen ilanlar birlestirilir."""
+        max_job_id = self.max_job_id()
+        snapshot = cv_index.snapshot()
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT job_watermark FROM recommendation_sync WHERE id = 1")
+            row = cursor.fetchone()
+            cursor.execute("SELECT cv_id FROM recommendation_state")
+            known = [r["cv_id"] for r in cursor.fetchall()]
+            cursor.execute("""
+                SELECT DISTINCT r.job_id FROM recommendations r
+                LEFT JOIN jobs j ON j.id = r.job_id
+                WHERE j.id IS NULL
+            """)
+            removed_jobs = [r["job_id"] for r in cursor.fetchall()]
+            new_jobs = []
+            if row is not None:
+                cursor.execute("SELECT id FROM jobs WHERE id > ? ORDER BY id", (row["job_watermark"],))
+                new_jobs = [r["id"] for r in cursor.fetchall()]
+
+        # Listesi olmayan CV'ler tum guncel ilanlarla skorlanacagi icin birlestirmeye katilmaz
+        missing = snapshot.alive & ~np.isin(snapshot.meta["cv_id"], known)
+        users = {int(user_id) for user_id in snapshot.ids[missing]}
+        for job_id in removed_jobs + new_jobs:
+            users |= self.merge_job(job_id, exclude=users)
+        self.refresh(sorted(users))
+        self.mark_synced(max_job_id)
+
+    def refresh(self, user_ids: list):
+        """Verilen kullanicilarin en son CV'lerinin listesini bastan hesaplar"""
+        entries = []
+        for user_id in user_ids:
+            entry = cv_index.get(user_id)
+            if entry is not None:
+                entries.append((user_id, entry[0], entry[1]["cv_id"]))
+        if not entries:
+            return
+
+        snapshot = get_job_index().snapshot()
+        for b0 in range(0, len(entries), RECOMMENDATION_BLOCK):
+            block = entries[b0:b0 + RECOMMENDATION_BLOCK]
+            queries = np.stack([vector for _, vector, _ in block])
+            thresholds = {}
+
+            with get_db(write=True) as conn:
+                cursor = conn.cursor()
+                for (user_id, _, cv_id), (job_ids, scores) in zip(block, top_k_search(snapshot, queries, self.k)):
+                    # Kullanicinin eski CV'lerine ait listeler de temizlenir
+                    cursor.execute("""
+                        DELETE FROM recommendations
+                        WHERE cv_id = ? OR cv_id IN (SELECT cv_id FROM recommendation_state WHERE user_id = ?)
+                    """, (cv_id, user_id))
+                    cursor.execute("DELETE FROM recommendation_state WHERE user_id = ? OR cv_id = ?", (user_id, cv_id))
+                    cursor.executemany(
+                        "INSERT INTO recommendations (cv_id, job_id, score) VALUES (?, ?, ?)",
+                        [(cv_id, int(job_id), float(score)) for job_id, score in zip(job_ids, scores)],
+                    )
+                    threshold = float(scores[-1]) if len(scores) >= self.k else RECOMMENDATION_NO_THRESHOLD
+                    cursor.execute("""
+                        INSERT INTO recommendation_state (cv_id, user_id, kth_score, refreshed_at)
+                        VALUES (?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+                    """, (cv_id, user_id, threshold))
+                    thresholds[user_id] = threshold
+                conn.commit()
+
+            for user_id, threshold in thresholds.items():
+                cv_index.set_meta(user_id, rec_threshold=threshold)
+            self.refreshed_cvs += len(block)
+
+    def merge_job(self, job_id: int, exclude: set = frozenset()) -> set:
+        """Ilani tum CV'lere karsi skorlar ve esigi gecen listelere ekler.
+
+        Ilani zaten listesinde tasiyan CV'lerin kullanici id'lerini dondurur; bu
+        listeler (ilan silindigi veya degistigi icin) bastan hesaplanmalidir.
+        """
+        with get_db(write=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT s.user_id FROM recommendations r
+                JOIN recommendation_state s ON s.cv_id = r.cv_id
+                WHERE r.job_id = ?
+            """, (job_id,))
+            affected = {r["user_id"] for r in cursor.fetchall()}
+            cursor.execute("DELETE FROM recommendations WHERE job_id = ?", (job_id,))
+            conn.commit()
+
+        entry = get_job_index().get(job_id)
+        if entry is None:
+            return affected
+        job_vector = entry[0]
+
+        snapshot = cv_index.snapshot()
+        hits = []
+        for r0 in range(0, len(snapshot.ids), 65536):
+            scores = snapshot.matrix[r0:r0 + 65536] @ job_vector
+            rows = np.flatnonzero(
+                snapshot.alive[r0:r0 + 65536] & (scores > snapshot.meta["rec_threshold"][r0:r0 + 65536])
+            )
+            hits.extend((int(snapshot.ids[r0 + i]), int(snapshot.meta["cv_id"][r0 + i]), float(scores[i])) for i in rows)
+        hits = [hit for hit in hits if hit[0] not in affected and hit[0] not in exclude]
+
+        thresholds = {}
+        with get_db(write=True) as conn:
+            cursor = conn.cursor()
+            for user_id, cv_id, score in hits:
+                cursor.execute(
+                    "INSERT OR REPLACE INTO recommendations (cv_id, job_id, score) VALUES (?, ?, ?)",
+                    (cv_id, job_id, score),
+                )
+                # Liste K'yi asarsa en dusuk skorlu ilan cikar
+                cursor.execute("""
+                    DELETE FROM recommendations WHERE cv_id = ? AND job_id NOT IN (
+                        SELECT job_id FROM recommendations WHERE cv_id = ? ORDER BY score DESC LIMIT ?
+                    )
+                """, (cv_id, cv_id, self.k))
+                cursor.execute(
+                    "SELECT COUNT(*) as count, MIN(score) as min_score FROM recommendations WHERE cv_id = ?",
+                    (cv_id,),
+                )
+                row = cursor.fetchone()
+                threshold = row["min_score"] if row["count"] >= self.k else RECOMMENDATION_NO_THRESHOLD
+                cursor.execute("""
+                    INSERT INTO recommendation_state (cv_id, user_id, kth_score, refreshed_at)
+                    VALUES (?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+                    ON CONFLICT(cv_id) DO UPDATE SET kth_score = excluded.kth_score, refreshed_at = excluded.refreshed_at
+                """, (cv_id, user_id, threshold))
+                thresholds[user_id] = threshold
+            conn.commit()
+
+        for user_id, threshold in thresholds.items():
+            cv_index.set_meta(user_id, rec_threshold=threshold)
+        self.merged_jobs += 1
+        return affected
+
+
+recommender = Recommender(RECOMMENDATION_K)
+if model is not None:
+    recommender.start()
 
 
 # ============================================================
@@ -662,6 +1958,7 @@ def home():
     return {"message": "Matchify API calisiyor!", "status": "ok"}
 
 @app.get("/health")
+@db_handler
 def health():
     try:
         with get_db() as conn:
@@ -671,6 +1968,99 @@ def health():
         return {"status": "error", "database": "disconnected"}
 
 
+@app.get("/metrics")
+def metrics():
+    """Calisma zamani metrikleri"""
+    completed = max(db_metrics["submitted"] - db_metrics["in_flight"], 1)
+    return {
+        "db_executor": {
+            "pool_size": DB_POOL_SIZE,
+            "queue_max": DB_QUEUE_MAX,
+            "queue_timeout_s": DB_QUEUE_TIMEOUT,
+            "submitted": db_metrics["submitted"],
+            "rejected": db_metrics["rejected"],
+            "in_flight": db_metrics["in_flight"],
+            "avg_queue_wait_ms": round(db_metrics["queue_wait_ms_total"] / completed, 3),
+            "max_queue_wait_ms": round(db_metrics["queue_wait_ms_max"], 3),
+            "avg_run_ms": round(db_metrics["run_ms_total"] / completed, 3),
+        },
+        "bcrypt": {
+            "rounds": BCRYPT_ROUNDS,
+            "workers": BCRYPT_WORKERS,
+            "queue_max": BCRYPT_QUEUE_MAX,
+            "queue_depth": bcrypt_metrics["in_flight"],
+            "completed": bcrypt_metrics["completed"],
+            "rejected": bcrypt_metrics["rejected"],
+            "avg_hash_ms": round(bcrypt_metrics["hash_ms_total"] / max(bcrypt_metrics["completed"], 1), 3),
+            "max_hash_ms": round(bcrypt_metrics["hash_ms_max"], 3),
+        },
+        "events": {
+            "fanout": EVENT_FANOUT,
+            "connections": event_hub.connections(),
+            "delivered": event_hub.delivered,
+            "dropped": event_hub.dropped,
+        },
+        "unread_counters": {
+            "cached": len(unread_counters.cache),
+            "hits": unread_counters.cache.hits,
+            "misses": unread_counters.cache.misses,
+            "repaired": unread_counters.repaired,
+            "last_reconcile": unread_counters.last_reconcile,
+        },
+        "message_writer": {
+            "group_commit": MESSAGE_GROUP_COMMIT,
+            "queued": message_writer.queue.qsize() if message_writer else 0,
+            "batches": message_writer.batches if message_writer else 0,
+            "messages": message_writer.messages if message_writer else 0,
+            "rejected": message_writer.rejected if message_writer else 0,
+            "failed": message_writer.failed if message_writer else 0,
+        },
+        "match_history": {
+            "pending": match_history_writer.pending(),
+            "flushed": match_history_writer.flushed,
+            "dropped": match_history_writer.dropped,
+            "failed": match_history_writer.failed,
+        },
+        "recommender": {
+            "k": RECOMMENDATION_K,
+            "pending": recommender.pending(),
+            "refreshed_cvs": recommender.refreshed_cvs,
+            "merged_jobs": recommender.merged_jobs,
+            "synced_at": recommender.synced_at,
+        },
+        "job_alerts": {
+            "min_score": job_alerter.min_score,
+            "queued": job_alerter.queue.qsize(),
+            "jobs": job_alerter.jobs,
+            "notified": job_alerter.notified,
+            "last_scan_ms": round(job_alerter.last_scan_ms, 3),
+        },
+        "match_cache": {
+            "entries": len(match_cache.cache),
+            "hits": match_cache.hits,
+            "misses": match_cache.misses,
+            "sliced": match_cache.sliced,
+            "hit_ratio": round(match_cache.hit_ratio(), 3),
+            "approx_bytes": match_cache.cache.size,
+        },
+        "singleflight": {
+            name: {"executed": flights.executed, "shared": flights.shared, "in_flight": flights.in_flight()}
+            for name, flights in (("matches", match_flights), ("cv_analysis", cv_analysis_flights))
+        },
+        "read_receipts": {
+            "pending": len(read_receipts.pending),
+            "flushed": read_receipts.flushed,
+            "batches": read_receipts.batches,
+            "failed": read_receipts.failed,
+        },
+        "token_cache": {
+            "size": len(verified_tokens),
+            "hits": verified_tokens.hits,
+            "misses": verified_tokens.misses,
+        }
+    }
+
+
 # ============================================================
 # CV METIN CIKARMA
 # ============================================================
@@ -730,18 +2120,37 @@ async def upload_file(file: UploadFile = File(...), user=Depends(verify_token)):
     # User ID'yi al
     user_id = get_user_id_from_token(user)
 
+    # Embedding yukleme aninda bir kez hesaplanir, /matches tekrar encode etmez
+    vector = encode_texts([text])[0] if model is not None else None
+    embedding = embedding_to_blob(vector) if vector is not None else None
+
     # Veritabanina kaydet
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO cvs (user_id, filename, text_content)
-            VALUES (?, ?, ?)
-        """, (user_id, file.filename, text))
+            INSERT INTO cvs (user_id, filename, text_content, embedding)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, file.filename, text, embedding))
         cv_id = cursor.lastrowid
+        bump_user_stats(cursor, user_id, cv_count=1)
         conn.commit()
 
-    # AI ile CV analizi yap
-    ai_analysis = analyze_cv_with_ai(text)
+        cursor.execute("SELECT open_to_work FROM users WHERE id=?", (user_id,))
+        open_to_work = bool(cursor.fetchone()["open_to_work"])
+
+    # Aday indeksinde kullanicinin en son CV'si guncel tutulur
+    if vector is not None and cv_index.loaded and user.get("role") == "jobseeker":
+        cv_index.upsert(user_id, vector, cv_id=cv_id, open_to_work=open_to_work,
+                        rec_threshold=RECOMMENDATION_NO_THRESHOLD)
+        recommender.cv_changed(user_id)
+
+    # Yeni CV, kullanicinin paylasilan /matches sonuclarini gecersiz kilar
+    match_flights.forget(lambda key: key[0] == user_id)
+
+    # AI ile CV analizi yap (ayni metnin eszamanli analizleri tek cagrida birlesir)
+    ai_analysis = await cv_analysis_flights.do_async(
+        hashlib.sha256(text.encode()).hexdigest(), analyze_cv_with_ai, text
+    )
 
     return {
         "success": True,
@@ -757,7 +2166,17 @@ async def upload_file(file: UploadFile = File(...), user=Depends(verify_token)):
 # KULLANICININ CV'LERINI LISTELE
 # ============================================================
 
+CV_LIST_SQL = """
+    SELECT id, filename, uploaded_at,
+           substr(text_content, 1, 200) as preview
+    FROM cvs
+    WHERE user_id = ?
+    ORDER BY uploaded_at DESC
+"""
+
+
 @app.get("/my-cvs")
+@db_handler
 def list_my_cvs(user=Depends(verify_token)):
     """Kullanicinin yukledigi tum CV'leri listeler"""
 
@@ -765,13 +2184,7 @@ def list_my_cvs(user=Depends(verify_token)):
 
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, filename, uploaded_at,
-                   substr(text_content, 1, 200) as preview
-            FROM cvs
-            WHERE user_id = ?
-            ORDER BY uploaded_at DESC
-        """, (user_id,))
+        cursor.execute(CV_LIST_SQL, (user_id,))
         rows = cursor.fetchall()
 
     return {
@@ -792,6 +2205,7 @@ def list_my_cvs(user=Depends(verify_token)):
 # ============================================================
 
 @app.get("/profile")
+@db_handler
 def get_profile(user=Depends(verify_token)):
     """Kullanicinin profil bilgilerini getirir"""
 
@@ -803,7 +2217,7 @@ def get_profile(user=Depends(verify_token)):
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, email, role, full_name, phone, bio, location,
-                   company_name, website, linkedin, skills, created_at
+                   company_name, website, linkedin, skills, open_to_work, created_at
             FROM users WHERE email=?
         """, (email,))
         result = cursor.fetchone()
@@ -823,11 +2237,13 @@ def get_profile(user=Depends(verify_token)):
         "website": result["website"],
         "linkedin": result["linkedin"],
         "skills": result["skills"],
+        "open_to_work": bool(result["open_to_work"]),
         "created_at": result["created_at"]
     }
 
 
 @app.put("/profile")
+@db_handler
 def update_profile(profile: ProfileUpdate, user=Depends(verify_token)):
     """Kullanicinin profil bilgilerini gunceller"""
 
@@ -835,11 +2251,11 @@ def update_profile(profile: ProfileUpdate, user=Depends(verify_token)):
     if not email:
         raise HTTPException(status_code=401, detail="Gecersiz token")
 
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
 
         # Mevcut kullaniciyi kontrol et
-        cursor.execute("SELECT id FROM users WHERE email=?", (email,))
+        cursor.execute(USER_BY_EMAIL_SQL, (email,))
         result = cursor.fetchone()
         if not result:
             raise HTTPException(status_code=404, detail="Kullanici bulunamadi")
@@ -851,153 +2267,433 @@ def update_profile(profile: ProfileUpdate, user=Depends(verify_token)):
                 phone = COALESCE(?, phone),
                 bio = COALESCE(?, bio),
                 location = COALESCE(?, location),
+                location_norm = COALESCE(?, location_norm),
                 company_name = COALESCE(?, company_name),
+                company_name_norm = COALESCE(?, company_name_norm),
                 website = COALESCE(?, website),
                 linkedin = COALESCE(?, linkedin),
-                skills = COALESCE(?, skills)
+                skills = COALESCE(?, skills),
+                open_to_work = COALESCE(?, open_to_work)
             WHERE email = ?
         """, (
             profile.full_name,
             profile.phone,
             profile.bio,
             profile.location,
+            normalize_filter_value(profile.location),
             profile.company_name,
+            normalize_filter_value(profile.company_name),
             profile.website,
             profile.linkedin,
             profile.skills,
+            None if profile.open_to_work is None else int(profile.open_to_work),
             email
         ))
         conn.commit()
 
+    # Arama gorunurlugu degistiyse aday indeksindeki bayragi yerinde guncelle
+    # (vektor degismedigi icin upsert'e gerek yok: olu satir birakmaz, generation artmaz)
+    if profile.open_to_work is not None and cv_index.loaded:
+        cv_index.set_meta(result["id"], open_to_work=profile.open_to_work)
+
     return {"success": True, "message": "Profil guncellendi"}
 
 
+USER_STATS_SQL = "SELECT * FROM user_stats WHERE user_id=?"
+
+
 @app.get("/user-stats")
+@db_handler
 def get_user_stats(user=Depends(verify_token)):
     """Kullanicinin istatistiklerini getirir"""
 
     user_id = get_user_id_from_token(user)
     role = user.get("role")
 
+    # Sayaclar yazim aninda guncellenir; burada tek satir okunur
     with get_db() as conn:
         cursor = conn.cursor()
+        cursor.execute(USER_STATS_SQL, (user_id,))
+        stats = cursor.fetchone()
 
-        if role == "employer":
-            # Employer istatistikleri
-            cursor.execute("SELECT COUNT(*) as count FROM jobs WHERE employer_id=?", (user_id,))
-            job_count = cursor.fetchone()["count"]
+    counts = {c: stats[c] if stats else 0 for c in USER_STAT_COLUMNS}
 
-            # Gelen basvuru sayisi
-            cursor.execute("""
-                SELECT COUNT(*) as count FROM applications a
-                JOIN jobs j ON a.job_id = j.id
-                WHERE j.employer_id = ?
-            """, (user_id,))
-            app_count = cursor.fetchone()["count"]
+    if role == "employer":
+        return {
+            "role": "employer",
+            "total_jobs": counts["job_count"],
+            "total_applications": counts["received_application_count"],
+            "views": 0
+        }
 
-            return {
-                "role": "employer",
-                "total_jobs": job_count,
-                "total_applications": app_count,
-                "views": 0
-            }
-        else:
-            # Jobseeker istatistikleri
-            cursor.execute("SELECT COUNT(*) as count FROM cvs WHERE user_id=?", (user_id,))
-            cv_count = cursor.fetchone()["count"]
-
-            cursor.execute("SELECT COUNT(*) as count FROM match_history WHERE user_id=?", (user_id,))
-            match_count = cursor.fetchone()["count"]
-
-            # Yapilan basvuru sayisi
-            cursor.execute("SELECT COUNT(*) as count FROM applications WHERE user_id=?", (user_id,))
-            app_count = cursor.fetchone()["count"]
-
-            return {
-                "role": "jobseeker",
-                "total_cvs": cv_count,
-                "total_matches": match_count,
-                "applications": app_count
-            }
+    return {
+        "role": "jobseeker",
+        "total_cvs": counts["cv_count"],
+        "total_matches": counts["match_count"],
+        "applications": counts["application_count"]
+    }
 
 
 # ============================================================
 # JOB CRUD
 # ============================================================
 
+# Ilan sayilari: (fts sorgusu, ilan surumu) -> toplam. Surum her ilan yaziminda artar;
+# TTL, baska bir surecin (orn. seed_jobs.py) yaptigi yazimlari da zamanla yansitir.
+job_totals_cache = LRUCache(maxsize=512, ttl=60)
+
+JOBS_SEARCH_SQL = """
+    SELECT j.id, j.title, j.description, j.employer_id, j.created_at
+    FROM jobs_fts
+    JOIN jobs j ON j.id = jobs_fts.rowid
+    WHERE jobs_fts MATCH ?
+    ORDER BY bm25(jobs_fts, 10.0, 1.0)
+    LIMIT ? OFFSET ?
+"""
+JOBS_PAGE_SQL = """
+    SELECT id, title, description, employer_id, created_at
+    FROM jobs
+    ORDER BY created_at DESC, id DESC
+    LIMIT ? OFFSET ?
+"""
+# Keyset sayfasi: satir-deger karsilastirmasi idx_jobs_created uzerinde aralik aramasi yapar
+JOBS_AFTER_SQL = """
+    SELECT id, title, description, employer_id, created_at
+    FROM jobs
+    WHERE (created_at, id) < (?, ?)
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+"""
+jobs_version = 0
+
+
+def bump_jobs_version():
+    global jobs_version
+    jobs_version += 1
+
+
+def count_jobs(cursor, fts_query: Optional[str]) -> int:
+    key = (fts_query, jobs_version)
+    total = job_totals_cache.get(key)
+    if total is None:
+        if fts_query:
+            cursor.execute("SELECT COUNT(*) as total FROM jobs_fts WHERE jobs_fts MATCH ?", (fts_query,))
+        else:
+            cursor.execute("SELECT COUNT(*) as total FROM jobs")
+        total = cursor.fetchone()["total"]
+        job_totals_cache.set(key, total)
+    return total
+
+
 @app.get("/jobs")
+@db_handler
 def list_jobs(
     search: Optional[str] = None,
     page: int = 1,
     limit: int = 10,
+    cursor: Optional[str] = None,
     user=Depends(verify_token)
 ):
-    """Is ilanlarini listeler, arama ve sayfalama destekler"""
+    """Is ilanlarini listeler, arama ve sayfalama destekler.
+
+    Arama FTS5 indeksi uzerinden yapilir; sonuclar bm25 ile siralanir ve
+    eslesen kisim snippet alaninda isaretlenir. Aramasiz listelemede
+    next_cursor ile (created_at, id) uzerinden keyset sayfalama yapilabilir;
+    page parametresi geriye uyumluluk icin korunur.
+    """
+    if page < 1 or limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="Gecersiz sayfalama parametreleri")
+
     offset = (page - 1) * limit
+    fts_query = build_fts_query(search) if search else None
+    if fts_query and cursor:
+        raise HTTPException(status_code=400, detail="cursor arama ile birlikte kullanilamaz, page kullanin")
+    after = decode_cursor(cursor, (str, int)) if cursor else None
 
     with get_db() as conn:
-        cursor = conn.cursor()
+        db = conn.cursor()
 
-        if search:
-            search_term = f"%{search}%"
-            cursor.execute("""
-                SELECT id, title, description, employer_id, created_at
-                FROM jobs
-                WHERE title LIKE ? OR description LIKE ?
-                ORDER BY created_at DESC
-                LIMIT ? OFFSET ?
-            """, (search_term, search_term, limit, offset))
+        if fts_query:
+            db.execute(JOBS_SEARCH_SQL, (fts_query, limit, offset))
+        elif after:
+            db.execute(JOBS_AFTER_SQL, (after[0], after[1], limit))
         else:
-            cursor.execute("""
-                SELECT id, title, description, employer_id, created_at
-                FROM jobs
-                ORDER BY created_at DESC
-                LIMIT ? OFFSET ?
-            """, (limit, offset))
+            db.execute(JOBS_PAGE_SQL, (limit, offset))
 
-        rows = cursor.fetchall()
+        rows = db.fetchall()
 
-        # Toplam ilan sayisi
-        if search:
-            cursor.execute("""
-                SELECT COUNT(*) as total FROM jobs
-                WHERE title LIKE ? OR description LIKE ?
-            """, (search_term, search_term))
-        else:
-            cursor.execute("SELECT COUNT(*) as total FROM jobs")
+        # Toplam ilan sayisi (ilan yazimlarinda gecersizlesen onbellekten)
+        total = count_jobs(db, fts_query)
 
-        total = cursor.fetchone()["total"]
+    jobs = []
+    for r in rows:
+        job = {
+            "id": r["id"],
+            "title": r["title"],
+            "description": r["description"],
+            "employer_id": r["employer_id"],
+            "created_at": r["created_at"]
+        }
+        if fts_query:
+            job["snippet"] = build_snippet(r["description"], search_terms(search))
+        jobs.append(job)
 
-    return {
-        "jobs": [
-            {
-                "id": r["id"],
-                "title": r["title"],
-                "description": r["description"],
-                "employer_id": r["employer_id"],
-                "created_at": r["created_at"]
-            }
-            for r in rows
-        ],
+    response = {
+        "jobs": jobs,
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": (total + limit - 1) // limit
     }
+    if not fts_query:
+        response["next_cursor"] = encode_cursor([rows[-1]["created_at"], rows[-1]["id"]]) if len(rows) == limit else None
+    return response
+
+
+# ---- Arama onerileri (autocomplete) ----
+class PrefixIndex:
+    """Normalize edilmis anahtarlarin sirali dizisi; on-ek aramasi bisect ile yapilir"""
+
+    def __init__(self, scan_limit: int = 500):
+        self._entries = []  # sirali (key, display, kind)
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.scan_limit = scan_limit
+
+    def add(self, entry: tuple):
+        with self._lock:
+            count = self._counts.get(entry, 0)
+            if count == 0:
+                bisect.insort(self._entries, entry)
+            self._counts[entry] = count + 1
+
+    def discard(self, entry: tuple):
+        with self._lock:
+            count = self._counts.get(entry, 0)
+            if count <= 1:
+                self._counts.pop(entry, None)
+                i = bisect.bisect_left(self._entries, entry)
+                if i < len(self._entries) and self._entries[i] == entry:
+                    del self._entries[i]
+            else:
+                self._counts[entry] = count - 1
+
+    def search(self, prefix: str, limit: int) -> list:
+        with self._lock:
+            start = bisect.bisect_left(self._entries, (prefix,))
+            best = {}
+            for entry in self._entries[start:start + self.scan_limit]:
+                if not entry[0].startswith(prefix):
+                    break
+                key = (entry[1], entry[2])
+                best[key] = max(best.get(key, 0), self._counts[entry])
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0][0]))
+        return [{"text": text, "type": kind, "count": count} for (text, kind), count in ranked[:limit]]
+
+
+def job_suggestion_entries(title: str, description: str) -> set:
+    """Ilanin oneri anahtarlari: basligin her kelimeden baslayan son eki ve cikarilan beceriler"""
+    entries = set()
+    display = " ".join(title.split())
+    words = normalize_search_text(display).split()
+    for i in range(len(words)):
+        entries.add((" ".join(words[i:]), display, "title"))
+    for skill in extract_skills_from_text(title + " " + description):
+        entries.add((normalize_search_text(skill), skill, "skill"))
+    return entries
+
+
+class JobSuggestions:
+    """Ilan yazimlarinda artimli guncellenen oneri indeksi"""
+
+    def __init__(self):
+        self.index = PrefixIndex()
+        self._job_entries = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        with self._lock:
+            if self.loaded:
+                return
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, title, description FROM jobs")
+                rows = cursor.fetchall()
+            for r in rows:
+                self._set(r["id"], job_suggestion_entries(r["title"], r["description"]))
+            self.loaded = True
+
+    def _set(self, job_id: int, entries: set):
+        old = self._job_entries.get(job_id, set())
+        for entry in old - entries:
+            self.index.discard(entry)
+        for entry in entries - old:
+            self.index.add(entry)
+        if entries:
+            self._job_entries[job_id] = entries
+        else:
+            self._job_entries.pop(job_id, None)
 
+    def upsert_job(self, job_id: int, title: str, description: str):
+        if self.loaded:
+            entries = job_suggestion_entries(title, description)
+            with self._lock:
+                self._set(job_id, entries)
 
-@app.get("/jobs/{job_id}")
-def get_job(job_id: int, user=Depends(verify_token)):
-    """Tek bir is ilanini getirir"""
+    def remove_job(self, job_id: int):
+        if self.loaded:
+            with self._lock:
+                self._set(job_id, set())
+
+
+job_suggestions = JobSuggestions()
+
+
+@app.get("/jobs/suggest")
+def suggest_jobs(q: str, limit: int = 8, user=Depends(verify_token)):
+    """Yazarken arama onerileri (ilan basliklari ve beceriler)"""
+    prefix = " ".join(normalize_search_text(q).split())
+    if not prefix:
+        return {"suggestions": []}
+    if not job_suggestions.loaded:
+        job_suggestions.load()
+    return {"suggestions": job_suggestions.index.search(prefix, max(1, min(limit, 20)))}
+
+
+# ---- Hibrit (kelime + semantik) arama ----
+HYBRID_LEXICAL_BUDGET_MS = int(os.getenv("HYBRID_LEXICAL_BUDGET_MS", 150))
+HYBRID_SEMANTIC_BUDGET_MS = int(os.getenv("HYBRID_SEMANTIC_BUDGET_MS", 300))
+HYBRID_CANDIDATES = 100
+RRF_K = 60
+
+hybrid_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+
+@lru_cache(maxsize=1024)
+def encode_query(normalized_query: str) -> np.ndarray:
+    """Arama sorgusunun embedding'i (ayni sorgu tekrar encode edilmez)"""
+    vector = encode_texts([normalized_query])[0]
+    vector.flags.writeable = False
+    return vector
+
+
+def lexical_candidates(fts_query: str, limit: int) -> list:
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT j.id, j.title, j.description, j.employer_id, j.created_at,
-                   u.email as employer_email, u.company_name, u.full_name as employer_name
-            FROM jobs j
-            LEFT JOIN users u ON j.employer_id = u.id
-            WHERE j.id = ?
-        """, (job_id,))
+            SELECT rowid FROM jobs_fts
+            WHERE jobs_fts MATCH ?
+            ORDER BY bm25(jobs_fts, 10.0, 1.0)
+            LIMIT ?
+        """, (fts_query, limit))
+        return [r["rowid"] for r in cursor.fetchall()]
+
+
+def semantic_candidates(normalized_query: str, limit: int) -> list:
+    vector = encode_query(normalized_query)
+    job_ids, _ = next(top_k_search(get_job_index().snapshot(), vector, limit))
+    return [int(job_id) for job_id in job_ids]
+
+
+def wait_for_leg(future, deadline: float):
+    """Bacagin sonucunu kendi suresi icinde bekler; gecikir veya hata verirse None doner"""
+    try:
+        return future.result(timeout=max(deadline - time.perf_counter(), 0))
+    except FutureTimeoutError:
+        return None
+    except Exception as e:
+        print(f"Hibrit arama bacagi hatasi: {e}")
+        return None
+
+
+@app.get("/jobs/search")
+def hybrid_search_jobs(q: str, k: int = 10, user=Depends(verify_token)):
+    """Kelime (FTS5) ve semantik (vektor indeksi) aramayi reciprocal rank fusion ile birlestirir.
+
+    Her bacagin kendi sure butcesi vardir; butceyi asan bacak sonuca katilmaz
+    ve yanit "degraded" alaninda belirtilir.
+    """
+    if k < 1 or k > 50:
+        raise HTTPException(status_code=400, detail="k 1 ile 50 arasinda olmali")
+
+    normalized = " ".join(normalize_search_text(q).split())
+    fts_query = build_fts_query(q)
+    if not fts_query:
+        raise HTTPException(status_code=400, detail="Arama metni bos olamaz")
+
+    start = time.perf_counter()
+    legs = {
+        "lexical": (hybrid_executor.submit(lexical_candidates, fts_query, HYBRID_CANDIDATES),
+                    start + HYBRID_LEXICAL_BUDGET_MS / 1000),
+        "semantic": (hybrid_executor.submit(semantic_candidates, normalized, HYBRID_CANDIDATES),
+                     start + HYBRID_SEMANTIC_BUDGET_MS / 1000),
+    }
+
+    ranks = {}
+    degraded = []
+    for leg, (future, deadline) in legs.items():
+        job_ids = wait_for_leg(future, deadline)
+        if job_ids is None:
+            degraded.append(leg)
+            continue
+        for rank, job_id in enumerate(job_ids, start=1):
+            ranks.setdefault(job_id, {})[leg] = rank
+
+    fused = sorted(
+        ranks.items(),
+        key=lambda item: sum(1.0 / (RRF_K + rank) for rank in item[1].values()),
+        reverse=True
+    )[:k]
+
+    results = []
+    if fused:
+        ids = [job_id for job_id, _ in fused]
+        with get_db() as conn:
+            cursor = conn.cursor()
+            placeholders = ",".join("?" * len(ids))
+            cursor.execute(f"""
+                SELECT id, title, description, employer_id, created_at
+                FROM jobs WHERE id IN ({placeholders})
+            """, ids)
+            rows = {r["id"]: r for r in cursor.fetchall()}
+
+        for job_id, leg_ranks in fused:
+            r = rows.get(job_id)
+            if r is None:
+                continue
+            results.append({
+                "id": r["id"],
+                "title": r["title"],
+                "description": r["description"],
+                "employer_id": r["employer_id"],
+                "created_at": r["created_at"],
+                "score": round(sum(1.0 / (RRF_K + rank) for rank in leg_ranks.values()), 5),
+                "lexical_rank": leg_ranks.get("lexical"),
+                "semantic_rank": leg_ranks.get("semantic")
+            })
+
+    return {
+        "query": q,
+        "jobs": results,
+        "degraded": degraded,
+        "took_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+@app.get("/jobs/{job_id}")
+@db_handler
+def get_job(job_id: int, user=Depends(verify_token)):
+    """Tek bir is ilanini getirir"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT j.id, j.title, j.description, j.employer_id, j.created_at,
+                   u.email as employer_email, u.company_name, u.full_name as employer_name
+            FROM jobs j
+            LEFT JOIN users u ON j.employer_id = u.id
+            WHERE j.id = ?
+        """, (job_id,))
         job = cursor.fetchone()
 
     if not job:
@@ -1015,6 +2711,64 @@ def get_job(job_id: int, user=Depends(verify_token)):
     }
 
 
+# (job_id, k, exclude_same_employer, indeks nesli) -> benzer ilanlar
+similar_jobs_cache = LRUCache(maxsize=4096)
+
+
+@app.get("/jobs/{job_id}/similar")
+def get_similar_jobs(job_id: int, k: int = 5, exclude_same_employer: bool = False, user=Depends(verify_token)):
+    """Ilanin saklanan embedding'ine gore benzer ilanlari getirir (model cagrisi yapmaz)"""
+    if k < 1 or k > 50:
+        raise HTTPException(status_code=400, detail="k 1 ile 50 arasinda olmali")
+
+    index = get_job_index()
+    cache_key = (job_id, k, exclude_same_employer, index.generation)
+    cached = similar_jobs_cache.get(cache_key)
+    if cached is not None:
+        return {"job_id": job_id, "similar": cached}
+
+    entry = index.get(job_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Is ilani bulunamadi")
+    job_vector, meta = entry
+
+    snapshot = index.snapshot()
+    mask = snapshot.ids != job_id
+    if exclude_same_employer and meta["employer_id"]:
+        mask &= snapshot.meta["employer_id"] != meta["employer_id"]
+
+    job_ids, sims = next(top_k_search(snapshot, job_vector, k, mask=mask))
+    similar = []
+    if len(job_ids):
+        ids = [int(similar_id) for similar_id in job_ids]
+        with get_db() as conn:
+            cursor = conn.cursor()
+            placeholders = ",".join("?" * len(ids))
+            cursor.execute(f"""
+                SELECT j.id, j.title, j.employer_id, j.created_at, u.company_name
+                FROM jobs j
+                LEFT JOIN users u ON j.employer_id = u.id
+                WHERE j.id IN ({placeholders})
+            """, ids)
+            rows = {r["id"]: r for r in cursor.fetchall()}
+
+        for similar_id, sim in zip(ids, sims):
+            r = rows.get(similar_id)
+            if r is None:
+                continue
+            similar.append({
+                "id": r["id"],
+                "title": r["title"],
+                "employer_id": r["employer_id"],
+                "company_name": r["company_name"],
+                "created_at": r["created_at"],
+                "score": round(max(float(sim), 0) * 100, 1)
+            })
+
+    similar_jobs_cache.set((job_id, k, exclude_same_employer, snapshot.generation), similar)
+    return {"job_id": job_id, "similar": similar}
+
+
 @app.post("/jobs")
 def create_job(job: JobCreate, user=Depends(verify_token)):
     # Sadece employer olusturabilir
@@ -1023,16 +2777,25 @@ def create_job(job: JobCreate, user=Depends(verify_token)):
         raise HTTPException(status_code=403, detail="Sadece isverenler is ilani olusturabilir")
 
     user_id = get_user_id_from_token(user)
+    vector = encode_job(job.title, job.description)
 
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            "INSERT INTO jobs (employer_id, title, description) VALUES (?, ?, ?)",
-            (user_id, job.title, job.description),
+            "INSERT INTO jobs (employer_id, title, description, embedding) VALUES (?, ?, ?, ?)",
+            (user_id, job.title, job.description, embedding_to_blob(vector) if vector is not None else None),
         )
         job_id = cursor.lastrowid
+        bump_user_stats(cursor, user_id, job_count=1)
         conn.commit()
 
+    if vector is not None and job_index.loaded:
+        job_index.upsert(job_id, vector, employer_id=user_id, created_ts=int(time.time()))
+    job_suggestions.upsert_job(job_id, job.title, job.description)
+    bump_jobs_version()
+    recommender.job_changed(job_id)
+    job_alerter.job_created(job_id)
+
     return {"success": True, "id": job_id, "title": job.title, "description": job.description}
 
 
@@ -1042,33 +2805,61 @@ def update_job(job_id: int, job: JobUpdate, user=Depends(verify_token)):
     if role != "employer":
         raise HTTPException(status_code=403, detail="Sadece isverenler is ilani guncelleyebilir")
 
-    with get_db() as conn:
+    vector = encode_job(job.title, job.description)
+
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            "UPDATE jobs SET title=?, description=? WHERE id=?",
-            (job.title, job.description, job_id),
+            "UPDATE jobs SET title=?, description=?, embedding=? WHERE id=?",
+            (job.title, job.description, embedding_to_blob(vector) if vector is not None else None, job_id),
         )
-        conn.commit()
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Ilan bulunamadi")
 
+        # Ilan metni degisti; basvuru skorlari yeni embedding ile tembel olarak yeniden hesaplanir
+        cursor.execute("UPDATE applications SET match_score = NULL WHERE job_id = ?", (job_id,))
+        conn.commit()
+
+        cursor.execute(
+            "SELECT employer_id, CAST(strftime('%s', created_at) AS INTEGER) as created_ts FROM jobs WHERE id=?",
+            (job_id,)
+        )
+        row = cursor.fetchone()
+
+    if vector is not None and job_index.loaded:
+        job_index.upsert(job_id, vector, employer_id=row["employer_id"] or 0, created_ts=row["created_ts"] or 0)
+    job_suggestions.upsert_job(job_id, job.title, job.description)
+    bump_jobs_version()
+    recommender.job_changed(job_id)
+
     return {"success": True, "message": "Ilan guncellendi", "id": job_id}
 
 
 @app.delete("/jobs/{job_id}")
+@db_handler
 def delete_job(job_id: int, user=Depends(verify_token)):
     role = user.get("role")
     if role != "employer":
         raise HTTPException(status_code=403, detail="Sadece isverenler is ilani silebilir")
 
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
+        cursor.execute("SELECT employer_id, application_count FROM jobs WHERE id=?", (job_id,))
+        job = cursor.fetchone()
+        if not job:
+            raise HTTPException(status_code=404, detail="Ilan bulunamadi")
+
         cursor.execute("DELETE FROM jobs WHERE id=?", (job_id,))
+        cursor.execute("DELETE FROM notifications WHERE job_id=?", (job_id,))
+        bump_user_stats(cursor, job["employer_id"], job_count=-1,
+                        received_application_count=-job["application_count"])
         conn.commit()
 
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Ilan bulunamadi")
+    job_index.remove(job_id)
+    job_suggestions.remove_job(job_id)
+    bump_jobs_version()
+    recommender.job_changed(job_id)
 
     return {"success": True, "message": "Ilan silindi", "id": job_id}
 
@@ -1077,6 +2868,30 @@ def delete_job(job_id: int, user=Depends(verify_token)):
 # APPLICATIONS
 # ============================================================
 
+APPLICATION_EXISTS_SQL = "SELECT id FROM applications WHERE job_id=? AND user_id=?"
+LATEST_CV_ID_SQL = "SELECT id FROM cvs WHERE user_id=? ORDER BY uploaded_at DESC LIMIT 1"
+MY_APPLICATIONS_SQL = """
+    SELECT a.id, a.job_id, a.status, a.applied_at, a.cover_letter,
+           j.title as job_title, j.description as job_description,
+           u.company_name, u.full_name as employer_name
+    FROM applications a
+    JOIN jobs j ON a.job_id = j.id
+    LEFT JOIN users u ON j.employer_id = u.id
+    WHERE a.user_id = ?
+    ORDER BY a.applied_at DESC
+"""
+EMPLOYER_APPLICATIONS_SQL = """
+    SELECT a.id, a.job_id, a.user_id, a.status, a.applied_at, a.cover_letter, a.cv_id,
+           j.title as job_title,
+           u.email as applicant_email, u.full_name as applicant_name, u.phone as applicant_phone
+    FROM applications a
+    JOIN jobs j ON a.job_id = j.id
+    JOIN users u ON a.user_id = u.id
+    WHERE j.employer_id = ?
+    ORDER BY a.applied_at DESC
+"""
+
+
 @app.post("/applications")
 def create_application(application: ApplicationCreate, user=Depends(verify_token)):
     """Is ilanina basvuru yapar"""
@@ -1087,7 +2902,7 @@ def create_application(application: ApplicationCreate, user=Depends(verify_token
 
     user_id = get_user_id_from_token(user)
 
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
 
         # Is ilani var mi kontrol et
@@ -1097,20 +2912,14 @@ def create_application(application: ApplicationCreate, user=Depends(verify_token
             raise HTTPException(status_code=404, detail="Is ilani bulunamadi")
 
         # Daha once basvuru yapilmis mi kontrol et
-        cursor.execute(
-            "SELECT id FROM applications WHERE job_id=? AND user_id=?",
-            (application.job_id, user_id)
-        )
+        cursor.execute(APPLICATION_EXISTS_SQL, (application.job_id, user_id))
         if cursor.fetchone():
             raise HTTPException(status_code=400, detail="Bu ilana zaten basvuru yapilmis")
 
         # CV belirtilmemisse en son CV'yi kullan
         cv_id = application.cv_id
         if not cv_id:
-            cursor.execute(
-                "SELECT id FROM cvs WHERE user_id=? ORDER BY uploaded_at DESC LIMIT 1",
-                (user_id,)
-            )
+            cursor.execute(LATEST_CV_ID_SQL, (user_id,))
             cv_row = cursor.fetchone()
             if cv_row:
                 cv_id = cv_row["id"]
@@ -1120,10 +2929,21 @@ def create_application(application: ApplicationCreate, user=Depends(verify_token
             INSERT INTO applications (job_id, user_id, cv_id, cover_letter)
             VALUES (?, ?, ?, ?)
         """, (application.job_id, user_id, cv_id, application.cover_letter))
-
         app_id = cursor.lastrowid
+
+        cursor.execute("UPDATE jobs SET application_count = application_count + 1 WHERE id=?", (application.job_id,))
+        bump_user_stats(cursor, job["employer_id"], received_application_count=1)
+        bump_user_stats(cursor, user_id, application_count=1)
         conn.commit()
 
+        # Eslesme skoru basvuru aninda hesaplanip saklanir
+        if model is not None:
+            score_applications(cursor, application.job_id, [app_id])
+            conn.commit()
+
+    # exclude_applied ile paylasilan /matches sonuclari artik eski
+    match_flights.forget(lambda key: key[0] == user_id)
+
     return {
         "success": True,
         "message": "Basvuru basariyla gonderildi",
@@ -1132,6 +2952,7 @@ def create_application(application: ApplicationCreate, user=Depends(verify_token
 
 
 @app.get("/applications")
+@db_handler
 def list_applications(user=Depends(verify_token)):
     """Kullanicinin basvurularini veya isverenin aldigi basvurulari listeler"""
 
@@ -1143,28 +2964,10 @@ def list_applications(user=Depends(verify_token)):
 
         if role == "jobseeker":
             # Is arayan - kendi basvurularini gorur
-            cursor.execute("""
-                SELECT a.id, a.job_id, a.status, a.applied_at, a.cover_letter,
-                       j.title as job_title, j.description as job_description,
-                       u.company_name, u.full_name as employer_name
-                FROM applications a
-                JOIN jobs j ON a.job_id = j.id
-                LEFT JOIN users u ON j.employer_id = u.id
-                WHERE a.user_id = ?
-                ORDER BY a.applied_at DESC
-            """, (user_id,))
+            cursor.execute(MY_APPLICATIONS_SQL, (user_id,))
         else:
             # Isveren - kendi ilanlarina gelen basvurulari gorur
-            cursor.execute("""
-                SELECT a.id, a.job_id, a.user_id, a.status, a.applied_at, a.cover_letter, a.cv_id,
-                       j.title as job_title,
-                       u.email as applicant_email, u.full_name as applicant_name, u.phone as applicant_phone
-                FROM applications a
-                JOIN jobs j ON a.job_id = j.id
-                JOIN users u ON a.user_id = u.id
-                WHERE j.employer_id = ?
-                ORDER BY a.applied_at DESC
-            """, (user_id,))
+            cursor.execute(EMPLOYER_APPLICATIONS_SQL, (user_id,))
 
         rows = cursor.fetchall()
 
@@ -1196,6 +2999,7 @@ def list_applications(user=Depends(verify_token)):
 
 
 @app.get("/applications/{application_id}")
+@db_handler
 def get_application(application_id: int, user=Depends(verify_token)):
     """Tek bir basvurunun detaylarini getirir"""
 
@@ -1244,6 +3048,7 @@ def get_application(application_id: int, user=Depends(verify_token)):
 
 
 @app.put("/applications/{application_id}/status")
+@db_handler
 def update_application_status(application_id: int, status_update: ApplicationStatusUpdate, user=Depends(verify_token)):
     """Basvuru durumunu gunceller (sadece isveren)"""
 
@@ -1256,17 +3061,18 @@ def update_application_status(application_id: int, status_update: ApplicationSta
 
     user_id = get_user_id_from_token(user)
 
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
 
         # Basvurunun isverenin ilanina ait oldugunu kontrol et
         cursor.execute("""
-            SELECT a.id FROM applications a
+            SELECT a.id, a.user_id, a.job_id, j.title as job_title FROM applications a
             JOIN jobs j ON a.job_id = j.id
             WHERE a.id = ? AND j.employer_id = ?
         """, (application_id, user_id))
 
-        if not cursor.fetchone():
+        application = cursor.fetchone()
+        if not application:
             raise HTTPException(status_code=404, detail="Basvuru bulunamadi veya yetkiniz yok")
 
         # Durumu guncelle
@@ -1277,10 +3083,19 @@ def update_application_status(application_id: int, status_update: ApplicationSta
         """, (status_update.status, application_id))
         conn.commit()
 
+    publish_events([(application["user_id"], {
+        "type": "application_status",
+        "application_id": application_id,
+        "job_id": application["job_id"],
+        "job_title": application["job_title"],
+        "status": status_update.status,
+    })])
+
     return {"success": True, "message": "Basvuru durumu guncellendi"}
 
 
 @app.get("/jobs/{job_id}/application-status")
+@db_handler
 def check_application_status(job_id: int, user=Depends(verify_token)):
     """Kullanicinin belirli bir ilana basvuru yapip yapmadigini kontrol eder"""
 
@@ -1309,28 +3124,218 @@ def check_application_status(job_id: int, user=Depends(verify_token)):
 # CV MATCHING
 # ============================================================
 
+# ---- Match history yazimi (write-behind) ----
+# /matches sonuclari istegi bekletmeden bellekteki tampona eklenir; arka plan thread'i
+# tamponu MATCH_HISTORY_FLUSH_INTERVAL saniyede bir (veya MATCH_HISTORY_BATCH_SIZE
+# satira ulasinca) executemany ile yazar. Tampon MATCH_HISTORY_BUFFER_MAX satirla
+# sinirlidir; doluyken gelen satirlar dusurulur ve /metrics'te sayilir.
+MATCH_HISTORY_FLUSH_INTERVAL = float(os.getenv("MATCH_HISTORY_FLUSH_INTERVAL", 1.0))
+MATCH_HISTORY_BATCH_SIZE = int(os.getenv("MATCH_HISTORY_BATCH_SIZE", 500))
+MATCH_HISTORY_BUFFER_MAX = int(os.getenv("MATCH_HISTORY_BUFFER_MAX", 10000))
+
+
+class MatchHistoryWriter:
+    """match_history satirlarini tamponlayip toplu yazar"""
+
+    def __init__(self, interval: float, batch_size: int, buffer_max: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.buffer_max = buffer_max
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name="match-history", daemon=True)
+        self.thread.start()
+
+    def record(self, user_id: int, cv_id: int, matches: list):
+        """(job_id, score) listesini tampona ekler; tampon doluysa satirlari dusurur"""
+        rows = [(user_id, cv_id, job_id, score) for job_id, score in matches]
+        with self.lock:
+            room = self.buffer_max - len(self.buffer)
+            if room < len(rows):
+                self.dropped += len(rows) - max(room, 0)
+                rows = rows[:max(room, 0)]
+            self.buffer.extend(rows)
+            full = len(self.buffer) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        # Zamanlayici ve kapanis ayni anda flush ederse satirlar karismasin
+        with self.flush_lock:
+            with self.lock:
+                rows, self.buffer = self.buffer, []
+            if not rows:
+                return
+
+            by_user = {}
+            for row in rows:
+                by_user.setdefault(row[0], []).append(row)
+
+            try:
+                with get_db(write=True) as conn:
+                    cursor = conn.cursor()
+                    for user_id, user_rows in by_user.items():
+                        cursor.executemany("""
+                            INSERT OR IGNORE INTO match_history (user_id, cv_id, job_id, score)
+                            VALUES (?, ?, ?, ?)
+                        """, user_rows)
+                        # Yalnizca gercekten eklenen (daha once kaydedilmemis) eslesmeler sayilir
+                        bump_user_stats(cursor, user_id, match_count=cursor.rowcount)
+                    conn.commit()
+            except Exception as e:
+                self.failed += len(rows)
+                print(f"Match history yazilamadi ({len(rows)} satir): {e}")
+                return
+
+            self.flushed += len(rows)
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.buffer)
+
+
+match_history_writer = MatchHistoryWriter(
+    MATCH_HISTORY_FLUSH_INTERVAL, MATCH_HISTORY_BATCH_SIZE, MATCH_HISTORY_BUFFER_MAX
+)
+
+
+@app.on_event("shutdown")
+def flush_match_history():
+    match_history_writer.flush()
+
+
+# ---- Istek birlestirme (singleflight) ----
+# Ayni (kullanici, CV, top_k, filtreler) icin eszamanli /matches istekleri tek hesaplamayi
+# paylasir; sonuc tamamlandiktan sonra MATCH_SINGLEFLIGHT_WINDOW saniye daha paylasilir.
+# /upload'daki CV analizi de ayni metin icin birlestirilir.
+MATCH_SINGLEFLIGHT_WINDOW = float(os.getenv("MATCH_SINGLEFLIGHT_WINDOW", 2.0))
+CV_ANALYSIS_SINGLEFLIGHT_WINDOW = float(os.getenv("CV_ANALYSIS_SINGLEFLIGHT_WINDOW", 10.0))
+
+match_flights = SingleFlight(MATCH_SINGLEFLIGHT_WINDOW)
+cv_analysis_flights = SingleFlight(CV_ANALYSIS_SINGLEFLIGHT_WINDOW)
+
+
+# ---- Eslesme sonucu onbellegi ----
+# Siralanmis eslesme listeleri (CV, filtreler, ilan indeksi nesli; oneri tablosundan gelen
+# sonuclarda CV'nin listesinin guncellenme ani) anahtariyla tutulur. Ilan eklenince/degisince/silinince nesil degistigi icin eski
+# kayitlar bir daha okunmaz ve LRU ile duser. Ilan yasi ve isveren profili (sirket,
+# konum) filtreleri zamana/profile bagli oldugundan kayitlar MATCH_CACHE_TTL ile sinirlidir.
+MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", 2000))
+MATCH_CACHE_TTL = float(os.getenv("MATCH_CACHE_TTL", 600))
+
+
+class MatchResultCache:
+    """/matches sonuclari icin LRU onbellek.
+
+    top_k anahtarda yer almaz: her anahtar icin hesaplanmis en uzun liste saklanir,
+    daha kucuk top_k istekleri bu listeden dilimlenir.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl, sizeof=lambda entry: len(json.dumps(entry, default=str)))
+        self.hits = 0
+        self.misses = 0
+        self.sliced = 0
+
+    def get(self, key, top_k: int):
+        """(yanit, sonuclar) veya None; saklanan liste top_k'dan kisaysa None"""
+        entry = self.cache.get(key)
+        if entry is None or entry[0] < top_k:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if entry[0] > top_k:
+            self.sliced += 1
+        return entry[1], entry[2]
+
+    def put(self, key, top_k: int, response: dict, results: list):
+        self.cache.set(key, (top_k, response, results))
+
+    def hit_ratio(self) -> float:
+        return self.hits / max(self.hits + self.misses, 1)
+
+
+match_cache = MatchResultCache(MATCH_CACHE_SIZE, MATCH_CACHE_TTL)
+
+
+def match_response(user_id: int, response: dict, results: list, top_k: int) -> dict:
+    """Hesaplanmis/onbellekteki sonuclardan top_k'lik yaniti olusturur ve match history'ye yazar"""
+    # Match history'ye kaydet (sadece top 5'i); yazim istek yolunun disinda toplu yapilir
+    match_history_writer.record(user_id, response["cv_id"], [(m["job_id"], m["score"]) for m in results[:5]])
+    return {**response, "matches": results[:top_k]}
+
+
 @app.get("/matches")
-def get_matches(cv_id: Optional[int] = None, top_k: int = 10, user=Depends(verify_token)):
-    """Kullanicinin CV'sine gore eslesen is ilanlarini dondurur"""
+def get_matches(
+    cv_id: Optional[int] = None,
+    top_k: int = 10,
+    employer_id: Optional[int] = None,
+    company: Optional[str] = None,
+    location: Optional[str] = None,
+    max_age_days: Optional[int] = None,
+    exclude_applied: bool = False,
+    user=Depends(verify_token)
+):
+    """Kullanicinin CV'sine gore eslesen is ilanlarini dondurur.
+
+    Filtreler (isveren, sirket, konum, ilan yasi, basvurulmus ilanlar) skorlamadan
+    once indeks uzerinde maskeye cevrilir; yalnizca kalan ilanlar skorlanir.
+    """
 
     if model is None:
         raise HTTPException(status_code=500, detail="Model yuklenemedi")
 
+    if top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k en az 1 olmali")
+    if max_age_days is not None and max_age_days < 0:
+        raise HTTPException(status_code=400, detail="max_age_days negatif olamaz")
+
     user_id = get_user_id_from_token(user)
 
+    # Ayni parametreli eszamanli istekler (cift tiklama, panel + eslesmeler sayfasi) tek hesaplamayi paylasir
+    key = (user_id, cv_id, top_k, employer_id, company, location, max_age_days, exclude_applied)
+    return match_flights.do(
+        key, compute_matches, user_id, cv_id, top_k,
+        employer_id, company, location, max_age_days, exclude_applied,
+    )
+
+
+def compute_matches(
+    user_id: int,
+    cv_id: Optional[int],
+    top_k: int,
+    employer_id: Optional[int],
+    company: Optional[str],
+    location: Optional[str],
+    max_age_days: Optional[int],
+    exclude_applied: bool,
+) -> dict:
+    index = get_job_index()
+
     # CV'yi veritabanindan cek
-    with get_db() as conn:
+    with get_db(write=True) as conn:
         cursor = conn.cursor()
 
         if cv_id:
             cursor.execute("""
-                SELECT id, filename, text_content
+                SELECT id, filename, text_content, embedding
                 FROM cvs
                 WHERE id=? AND user_id=?
             """, (cv_id, user_id))
         else:
             cursor.execute("""
-                SELECT id, filename, text_content
+                SELECT id, filename, text_content, embedding
                 FROM cvs
                 WHERE user_id=?
                 ORDER BY uploaded_at DESC
@@ -1339,83 +3344,283 @@ def get_matches(cv_id: Optional[int] = None, top_k: int = 10, user=Depends(verif
 
         cv = cursor.fetchone()
 
-    if not cv:
-        raise HTTPException(status_code=404, detail="CV bulunamadi. Once bir CV yuklemelisin.")
+        if not cv:
+            raise HTTPException(status_code=404, detail="CV bulunamadi. Once bir CV yuklemelisin.")
+
+        # CV embedding'i (yuklemede hesaplanmadiysa simdi hesaplanip saklanir)
+        cv_embedding = get_cv_embedding(cursor, cv)
+        conn.commit()
+
+        snapshot = index.snapshot()
+
+        # Basvurulan ilanlar disarida birakiliyorsa yeni basvuru sonucu degistirir
+        applied_count = None
+        if exclude_applied:
+            cursor.execute("SELECT COUNT(*) as count FROM applications WHERE user_id = ?", (user_id,))
+            applied_count = cursor.fetchone()["count"]
+
+        # Filtresiz istekler oneri tablosundan karsilanir; anahtar yalnizca o zaman bu CV'nin
+        # listesinin guncellenme anini icerir (baska CV'lerin guncellenmesi onbellegi bozmaz)
+        state = None
+        if (employer_id is None and not company and not location and max_age_days is None
+                and not applied_count and top_k <= RECOMMENDATION_K):
+            cursor.execute("SELECT refreshed_at FROM recommendation_state WHERE cv_id = ?", (cv["id"],))
+            state = cursor.fetchone()
+        cache_key = (cv["id"], employer_id, company, location, max_age_days, applied_count,
+                     snapshot.generation, state["refreshed_at"] if state is not None else None)
+        cached = match_cache.get(cache_key, top_k)
+        if cached is not None:
+            return match_response(user_id, *cached, top_k)
+
+        mask = build_job_filter_mask(
+            snapshot, cursor, user_id,
+            employer_id=employer_id,
+            company=company,
+            location=location,
+            max_age_days=max_age_days,
+            exclude_applied=exclude_applied,
+        )
+
+        # Filtresiz istekler onceden hesaplanmis oneri tablosundan karsilanir
+        scored = None
+        refreshed_at = None
+        if mask is None and state is not None:
+            cursor.execute(
+                "SELECT job_id, score FROM recommendations WHERE cv_id = ? ORDER BY score DESC LIMIT ?",
+                (cv["id"], max(top_k, 5)),
+            )
+            scored = [(r["job_id"], round(max(r["score"], 0) * 100, 1)) for r in cursor.fetchall()]
+            refreshed_at = max(state["refreshed_at"][:19], recommender.synced_at or "")
 
     cv_id = cv["id"]
     cv_filename = cv["filename"]
     cv_text = cv["text_content"]
 
-    # CV embedding'ini olustur
-    cv_embedding = model.encode(cv_text, normalize_embeddings=True)
+    candidate_count = int(np.count_nonzero(snapshot.alive if mask is None else snapshot.alive & mask))
 
-    # Tum is ilanlarini yukle
-    jobs = load_jobs_from_db()
-
-    if not jobs:
+    if candidate_count == 0:
         return {
             "success": True,
             "cv_id": cv_id,
             "cv_filename": cv_filename,
             "total_jobs": 0,
             "matches": [],
-            "message": "Henuz is ilani bulunmuyor"
+            "message": "Henuz is ilani bulunmuyor" if mask is None else "Filtrelere uyan is ilani bulunamadi"
         }
 
-    # Eslesmeleri hesapla
-    results = []
-    for job in jobs:
-        sim = float(np.dot(cv_embedding, job["embedding"]))
-        sim = max(sim, 0)
-        score = round(sim * 100, 1)
-
-        # AI ile detayli analiz (opsiyonel - her is icin yapmak pahali olabilir)
-        ai_match_analysis = analyze_job_match_with_ai(
-            cv_text=cv_text,
-            job_title=job["title"],
-            job_description=job["description"],
-            similarity_score=score
+    # Eslesmeleri hesapla (match history icin en az ilk 5 gerekli)
+    if scored is None:
+        job_ids, sims = next(top_k_search(snapshot, cv_embedding, max(top_k, 5), mask=mask))
+        scored = [(int(job_id), round(max(float(sim), 0) * 100, 1)) for job_id, sim in zip(job_ids, sims)]
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        placeholders = ",".join("?" * len(scored))
+        cursor.execute(
+            f"SELECT id, title, description FROM jobs WHERE id IN ({placeholders})",
+            [job_id for job_id, _ in scored]
         )
+        job_rows = {r["id"]: r for r in cursor.fetchall()}
 
-        results.append({
-            "job_id": job["id"],
+    results = []
+    for rank, (job_id, score) in enumerate(scored):
+        job = job_rows.get(job_id)
+        if job is None:
+            continue
+
+        match = {
+            "job_id": job_id,
             "title": job["title"],
             "description": job["description"],
             "score": score,
-            "ai_analysis": ai_match_analysis
-        })
-
-    # Score'a gore sirala
-    results.sort(key=lambda x: x["score"], reverse=True)
-
-    # Match history'ye kaydet (sadece top 5'i)
-    with get_db() as conn:
-        cursor = conn.cursor()
-        for match in results[:5]:
-            try:
-                cursor.execute("""
-                    INSERT OR IGNORE INTO match_history (user_id, cv_id, job_id, score)
-                    VALUES (?, ?, ?, ?)
-                """, (user_id, cv_id, match["job_id"], match["score"]))
-            except:
-                pass
-        conn.commit()
+        }
+        # AI ile detayli analiz sadece donulecek ilanlar icin yapilir
+        if rank < top_k:
+            match["ai_analysis"] = analyze_job_match_with_ai(
+                cv_text=cv_text,
+                job_title=job["title"],
+                job_description=job["description"],
+                similarity_score=score
+            )
+        results.append(match)
 
-    return {
+    response = {
         "success": True,
         "cv_id": cv_id,
         "cv_filename": cv_filename,
-        "total_jobs": len(results),
-        "matches": results[:top_k]
+        "total_jobs": candidate_count,
     }
+    if refreshed_at is not None:
+        # Sonuclar oneri tablosundan geldi; hangi ana kadar guncel oldugu (UTC)
+        response["recommendations_refreshed_at"] = refreshed_at
+    match_cache.put(cache_key, top_k, response, results)
+    return match_response(user_id, response, results, top_k)
+
+
+MATCH_BATCH_BLOCK = 256
+MATCH_BATCH_MAX_CVS = 10000
+
+
+@app.post("/matches/batch")
+def get_matches_batch(request: BatchMatchRequest, user=Depends(verify_token)):
+    """Birden fazla CV icin eslesmeleri tek seferde hesaplar (NDJSON akisi).
+
+    CV embedding'leri bloklar halinde matrise dizilir ve her blok icin tek bir
+    (blok x dim) @ (dim x ilan) carpimi yapilir. Her satir bir CV'nin sonucudur.
+    """
+
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model yuklenemedi")
+
+    if not request.cv_ids:
+        raise HTTPException(status_code=400, detail="En az bir cv_id gerekli")
+    if len(request.cv_ids) > MATCH_BATCH_MAX_CVS:
+        raise HTTPException(status_code=400, detail=f"Tek istekte en fazla {MATCH_BATCH_MAX_CVS} CV islenebilir")
+    if request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k en az 1 olmali")
+
+    user_id = get_user_id_from_token(user)
+    snapshot = get_job_index().snapshot()
+    cv_ids = list(dict.fromkeys(request.cv_ids))
+    top_k = request.top_k
+
+    def generate():
+        for b0 in range(0, len(cv_ids), MATCH_BATCH_BLOCK):
+            block_ids = cv_ids[b0:b0 + MATCH_BATCH_BLOCK]
+
+            with get_db(write=True) as conn:
+                cursor = conn.cursor()
+                placeholders = ",".join("?" * len(block_ids))
+                cursor.execute(f"""
+                    SELECT id, filename, text_content, embedding
+                    FROM cvs
+                    WHERE user_id = ? AND id IN ({placeholders})
+                """, [user_id] + block_ids)
+                cvs = {r["id"]: r for r in cursor.fetchall()}
+                found = [cv_id for cv_id in block_ids if cv_id in cvs]
+                vectors = [get_cv_embedding(cursor, cvs[cv_id]) for cv_id in found]
+                conn.commit()
+
+            results = {}
+            if found:
+                results = dict(zip(found, top_k_search(snapshot, np.stack(vectors), top_k)))
+
+            job_ids = {int(job_id) for ids, _ in results.values() for job_id in ids}
+            titles = {}
+            if job_ids:
+                with get_db() as conn:
+                    cursor = conn.cursor()
+                    placeholders = ",".join("?" * len(job_ids))
+                    cursor.execute(f"SELECT id, title FROM jobs WHERE id IN ({placeholders})", list(job_ids))
+                    titles = {r["id"]: r["title"] for r in cursor.fetchall()}
+
+            for cv_id in block_ids:
+                if cv_id not in results:
+                    yield json.dumps({"cv_id": cv_id, "error": "CV bulunamadi"}) + "\n"
+                    continue
+                ids, sims = results[cv_id]
+                yield json.dumps({
+                    "cv_id": cv_id,
+                    "cv_filename": cvs[cv_id]["filename"],
+                    "matches": [
+                        {
+                            "job_id": int(job_id),
+                            "title": titles[int(job_id)],
+                            "score": round(max(float(sim), 0) * 100, 1)
+                        }
+                        for job_id, sim in zip(ids, sims)
+                        if int(job_id) in titles
+                    ]
+                }, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 # ============================================================
 # REGISTER
 # ============================================================
 
+# ---- Sifre hashleme havuzu ----
+# bcrypt istek basina 100-300 ms CPU harcar; paylasilan threadpool'u tikamamasi
+# icin ayri ve sinirli bir havuzda calisir. Havuz doluysa istek beklemeden 503 alir.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", os.cpu_count() or 2))
+BCRYPT_QUEUE_MAX = int(os.getenv("BCRYPT_QUEUE_MAX", 32))
+
+bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_metrics_lock = threading.Lock()
+
+bcrypt_metrics = {
+    "completed": 0,
+    "rejected": 0,
+    "in_flight": 0,
+    "hash_ms_total": 0.0,
+    "hash_ms_max": 0.0,
+}
+
+
+def _timed_bcrypt(fn, args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with _bcrypt_metrics_lock:
+            bcrypt_metrics["completed"] += 1
+            bcrypt_metrics["hash_ms_total"] += elapsed_ms
+            bcrypt_metrics["hash_ms_max"] = max(bcrypt_metrics["hash_ms_max"], elapsed_ms)
+
+
+async def run_bcrypt(fn, *args):
+    """bcrypt islemini ayri havuzda calistirir; kuyruk doluysa 503 dondurur"""
+    if bcrypt_metrics["in_flight"] >= BCRYPT_QUEUE_MAX:
+        bcrypt_metrics["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Sunucu yogun, lutfen birazdan tekrar deneyin",
+            headers={"Retry-After": "2"},
+        )
+
+    bcrypt_metrics["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(bcrypt_executor, _timed_bcrypt, fn, args)
+    finally:
+        bcrypt_metrics["in_flight"] -= 1
+
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def find_user_by_email(email: str):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, email, password, role FROM users WHERE email=?", (email,))
+        return cursor.fetchone()
+
+
+def insert_user(email: str, hashed: str, role: str) -> int:
+    with get_db(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO users (email, password, role)
+                VALUES (?, ?, ?)
+            """, (email, hashed, role))
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=400, detail="Bu email zaten kayitli")
+        user_id = cursor.lastrowid
+        conn.commit()
+    return user_id
+
+
 @app.post("/register")
-def register(user: UserRegister):
+async def register(user: UserRegister):
     # Email validation
     if "@" not in user.email:
         raise HTTPException(status_code=400, detail="Gecerli bir email adresi gir")
@@ -1428,23 +3633,12 @@ def register(user: UserRegister):
     if user.role not in ["employer", "jobseeker"]:
         raise HTTPException(status_code=400, detail="Rol 'employer' veya 'jobseeker' olmali")
 
-    with get_db() as conn:
-        cursor = conn.cursor()
-
-        # Email kontrolu
-        cursor.execute("SELECT id FROM users WHERE email=?", (user.email,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Bu email zaten kayitli")
-
-        hashed = bcrypt.hashpw(user.password.encode("utf-8"), bcrypt.gensalt())
-
-        cursor.execute("""
-            INSERT INTO users (email, password, role)
-            VALUES (?, ?, ?)
-        """, (user.email, hashed.decode("utf-8"), user.role))
+    # Email kontrolu
+    if await run_db(find_user_by_email, user.email):
+        raise HTTPException(status_code=400, detail="Bu email zaten kayitli")
 
-        user_id = cursor.lastrowid
-        conn.commit()
+    hashed = await run_bcrypt(hash_password, user.password)
+    user_id = await run_db(insert_user, user.email, hashed, user.role)
 
     return {"success": True, "message": "Kayit basarili!", "user_id": user_id}
 
@@ -1454,11 +3648,8 @@ def register(user: UserRegister):
 # ============================================================
 
 @app.post("/login")
-def login(user: UserLogin):
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, email, password, role FROM users WHERE email=?", (user.email,))
-        result = cursor.fetchone()
+async def login(user: UserLogin):
+    result = await run_db(find_user_by_email, user.email)
 
     if not result:
         raise HTTPException(status_code=401, detail="Email veya sifre hatali")
@@ -1468,10 +3659,10 @@ def login(user: UserLogin):
     hashed_pw = result["password"]
     role = result["role"]
 
-    if not bcrypt.checkpw(user.password.encode("utf-8"), hashed_pw.encode("utf-8")):
+    if not await run_bcrypt(check_password, user.password, hashed_pw):
         raise HTTPException(status_code=401, detail="Email veya sifre hatali")
 
-    access_token = create_access_token({"sub": email, "role": role})
+    access_token = create_access_token({"sub": email, "role": role, "uid": user_id})
 
     return {
         "success": True,
@@ -1483,89 +3674,558 @@ def login(user: UserLogin):
     }
 
 
+# ============================================================
+# GERCEK ZAMANLI OLAYLAR (SSE)
+# ============================================================
+
+# Baglanan kullanicilara yeni mesaj ve basvuru durumu olaylari Server-Sent Events
+# ile itilir; istemcilerin /conversations ve /messages yoklamasina gerek kalmaz.
+# EVENT_FANOUT=local tek surecte dogrudan dagitir; birden fazla worker calistiginda
+# EVENT_FANOUT=sqlite olaylari outbox tablosuna yazar ve her worker tablodan okur.
+EVENT_FANOUT = os.getenv("EVENT_FANOUT", "local")
+EVENT_QUEUE_MAX = int(os.getenv("EVENT_QUEUE_MAX", 100))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", 15))
+EVENT_OUTBOX_POLL_INTERVAL = float(os.getenv("EVENT_OUTBOX_POLL_INTERVAL", 0.2))
+EVENT_OUTBOX_RETENTION = float(os.getenv("EVENT_OUTBOX_RETENTION", 60))
+
+
+class EventHub:
+    """Surec ici pub/sub: kullanici basina abone kuyruklari"""
+
+    def __init__(self, queue_max: int):
+        self.queue_max = queue_max
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_max)
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add((loop, queue))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        with self.lock:
+            subscribers = self.subscribers.get(user_id, set())
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                self.subscribers.pop(user_id, None)
+
+    def deliver(self, user_id: int, event: dict):
+        """Herhangi bir thread'den cagrilabilir; olay abonenin event loop'una aktarilir"""
+        with self.lock:
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    def _put(self, queue: asyncio.Queue, event: dict):
+        # Yavas istemci diger kullanicilari bekletmesin: kuyruk doluysa olay dusurulur
+        if queue.full():
+            self.dropped += 1
+        else:
+            queue.put_nowait(event)
+            self.delivered += 1
+
+    def connections(self) -> int:
+        with self.lock:
+            return sum(len(s) for s in self.subscribers.values())
+
+
+class LocalFanout:
+    """Tek surec: olaylar dogrudan hub'a verilir"""
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+
+    def publish(self, events: list):
+        for user_id, event in events:
+            self.hub.deliver(user_id, event)
+
+
+class SQLiteOutboxFanout:
+    """Coklu worker: olaylar outbox tablosuna yazilir, her worker yeni satirlari okuyup kendi hub'ina dagitir"""
+
+    def __init__(self, hub: EventHub, poll_interval: float, retention: float):
+        self.hub = hub
+        self.poll_interval = poll_interval
+        self.retention = retention
+        with get_db() as conn:
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) as id FROM event_outbox").fetchone()
+        self.last_id = row["id"]
+        self.thread = threading.Thread(target=self._run, name="event-outbox", daemon=True)
+        self.thread.start()
+
+    def publish(self, events: list):
+        now = time.time()
+        with get_db(write=True) as conn:
+            conn.executemany(
+                "INSERT INTO event_outbox (user_id, payload, created_at) VALUES (?, ?, ?)",
+                [(user_id, json.dumps(event), now) for user_id, event in events],
+            )
+            conn.commit()
+
+    def _run(self):
+        last_prune = time.time()
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+                if time.time() - last_prune > self.retention:
+                    self.prune()
+                    last_prune = time.time()
+            except Exception as e:
+                print(f"Olay outbox okunamadi: {e}")
+
+    def poll(self):
+        with get_db() as conn:
+            rows = conn.execute(
+                "SELECT id, user_id, payload FROM event_outbox WHERE id > ? ORDER BY id LIMIT 500",
+                (self.last_id,),
+            ).fetchall()
+        for row in rows:
+            self.hub.deliver(row["user_id"], json.loads(row["payload"]))
+            self.last_id = row["id"]
+
+    def prune(self):
+        with get_db(write=True) as conn:
+            conn.execute("DELETE FROM event_outbox WHERE created_at < ?", (time.time() - self.retention,))
+            conn.commit()
+
+
+event_hub = EventHub(EVENT_QUEUE_MAX)
+event_fanout = (
+    SQLiteOutboxFanout(event_hub, EVENT_OUTBOX_POLL_INTERVAL, EVENT_OUTBOX_RETENTION)
+    if EVENT_FANOUT == "sqlite" else LocalFanout(event_hub)
+)
+
+
+def publish_events(events: list):
+    """(user_id, olay) listesini dagitir; commit'ten sonra cagrilmalidir"""
+    if not events:
+        return
+    try:
+        event_fanout.publish(events)
+    except Exception as e:
+        # Olay kaybi istegi basarisiz yapmaz; istemci yeniden baglaninca guncel veriyi ceker
+        print(f"Olay yayinlanamadi: {e}")
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+@app.get("/events")
+async def stream_events(token: str):
+    """Kullanicinin olay akisi (text/event-stream).
+
+    EventSource ozel header gonderemedigi icin JWT query parametresi olarak alinir.
+    """
+    user = verify_token(token)
+    user_id = await run_db(get_user_id_from_token, user)
+
+    queue = event_hub.subscribe(user_id)
+
+    async def stream():
+        try:
+            yield format_sse({"type": "ready", "user_id": user_id})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Proxy'lerin baglantiyi kapatmamasi icin yorum satiri
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ============================================================
 # MESSAGING
 # ============================================================
 
+# ---- Okunmamis mesaj sayaclari ----
+# Sayaclar user_unread tablosunda mesaj yazimiyla ayni transaction'da guncellenir
+# (write-through) ve kisa TTL'li bellek onbelleginden okunur. TTL, diger worker'larin
+# yazdigi degisikliklerin en gec ne zaman gorunecegini belirler. Periyodik uzlastirma
+# sayaclari mesaj tablosundan yeniden hesaplayip olasi sapmalari duzeltir.
+UNREAD_CACHE_TTL = float(os.getenv("UNREAD_CACHE_TTL", 5))
+UNREAD_RECONCILE_INTERVAL = float(os.getenv("UNREAD_RECONCILE_INTERVAL", 300))
+
+USER_UNREAD_SQL = "SELECT unread_count FROM user_unread WHERE user_id = ?"
+
+
+class UnreadCounters:
+    """Kullanici basina okunmamis mesaj sayisi: SQLite + bellek onbellegi"""
+
+    def __init__(self, ttl: float, reconcile_interval: float):
+        self.cache = LRUCache(maxsize=10000, ttl=ttl)
+        self.reconcile_interval = reconcile_interval
+        self.repaired = 0
+        self.last_reconcile = None
+        self.thread = threading.Thread(target=self._run, name="unread-reconcile", daemon=True)
+        self.thread.start()
+
+    def get(self, user_id: int) -> int:
+        count = self.cache.get(user_id)
+        if count is not None:
+            return count
+
+        with get_db() as conn:
+            row = conn.execute(USER_UNREAD_SQL, (user_id,)).fetchone()
+        count = row["unread_count"] if row else 0
+        self.cache.set(user_id, count)
+        return count
+
+    def add(self, cursor, user_id: int, delta: int) -> int:
+        """Sayaci cagiranin transaction'i icinde degistirir ve yeni degeri dondurur.
+
+        Onbellek commit'ten sonra remember() ile guncellenmelidir.
+        """
+        cursor.execute("""
+            INSERT INTO user_unread (user_id, unread_count) VALUES (?, MAX(?, 0))
+            ON CONFLICT(user_id) DO UPDATE SET unread_count = MAX(unread_count + ?, 0)
+            RETURNING unread_count
+        """, (user_id, delta, delta))
+        return cursor.fetchone()["unread_count"]
+
+    def remember(self, user_id: int, count: int):
+        self.cache.set(user_id, count)
+
+    def _run(self):
+        while True:
+            time.sleep(self.reconcile_interval)
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Okunmamis sayaclari uzlastirilamadi: {e}")
+
+    def reconcile(self) -> int:
+        """Sayaclari mesaj tablosuyla karsilastirir, sapanlari duzeltir"""
+        with get_db(write=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE user_unread SET unread_count = (
+                    SELECT COUNT(*) FROM messages WHERE receiver_id = user_unread.user_id AND is_read = 0
+                )
+                WHERE unread_count != (
+                    SELECT COUNT(*) FROM messages WHERE receiver_id = user_unread.user_id AND is_read = 0
+                )
+            """)
+            repaired = cursor.rowcount
+            cursor.execute("""
+                INSERT INTO user_unread (user_id, unread_count)
+                SELECT receiver_id, COUNT(*) FROM messages
+                WHERE is_read = 0 AND receiver_id NOT IN (SELECT user_id FROM user_unread)
+                GROUP BY receiver_id
+            """)
+            repaired += cursor.rowcount
+            conn.commit()
+
+        self.cache.clear()
+        self.repaired += repaired
+        self.last_reconcile = time.time()
+        return repaired
+
+
+unread_counters = UnreadCounters(UNREAD_CACHE_TTL, UNREAD_RECONCILE_INTERVAL)
+
+
+CONVERSATION_UPSERT_SQL = """
+    INSERT INTO conversations (user1_id, user2_id, application_id, last_message,
+                               last_message_id, last_message_at, user1_unread, user2_unread)
+    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?, ?)
+    ON CONFLICT(user1_id, user2_id, IFNULL(application_id, 0)) DO UPDATE SET
+        last_message = excluded.last_message,
+        last_message_id = excluded.last_message_id,
+        last_message_at = excluded.last_message_at,
+        user1_unread = user1_unread + excluded.user1_unread,
+        user2_unread = user2_unread + excluded.user2_unread
+"""
+
+
+def write_message(cursor, sender_id: int, message: MessageCreate):
+    """Mesaji, sohbet ozetini ve alicinin sayacini cagiranin transaction'i icinde yazar"""
+    cursor.execute("""
+        INSERT INTO messages (sender_id, receiver_id, application_id, content)
+        VALUES (?, ?, ?, ?)
+    """, (sender_id, message.receiver_id, message.application_id, message.content))
+    message_id = cursor.lastrowid
+
+    # Sohbet ozetini ayni transaction icinde guncelle (son mesaj + alicinin sayaci)
+    user1 = min(sender_id, message.receiver_id)
+    user2 = max(sender_id, message.receiver_id)
+    user1_unread = 1 if message.receiver_id == user1 else 0
+
+    cursor.execute(CONVERSATION_UPSERT_SQL, (user1, user2, message.application_id, message.content,
+                                             message_id, user1_unread, 1 - user1_unread))
+
+    receiver_unread = unread_counters.add(cursor, message.receiver_id, 1)
+    return message_id, receiver_unread
+
+
+def receiver_exists(receiver_id: int) -> bool:
+    with get_db() as conn:
+        return conn.execute("SELECT id FROM users WHERE id=?", (receiver_id,)).fetchone() is not None
+
+
+def store_message(sender_id: int, message: MessageCreate):
+    """Tek mesaji kendi transaction'inda yazar"""
+    with get_db(write=True) as conn:
+        cursor = conn.cursor()
+        result = write_message(cursor, sender_id, message)
+        conn.commit()
+    return result
+
+
+# ---- Toplu commit (group commit) ----
+# MESSAGE_GROUP_COMMIT=1 iken mesajlar bir kuyruga alinir; yazici thread kuyrukta
+# bekleyenlerin hepsini (en fazla MESSAGE_BATCH_MAX) tek transaction'da yazar. Bir
+# commit surerken gelen mesajlar bir sonraki grubu olusturur; MESSAGE_BATCH_WAIT_MS
+# ile grup icin ayrica beklenebilir. Her cagiran, mesajinin yer aldigi transaction
+# commit edildikten sonra mesaj id'sini alir. Kuyruk MESSAGE_QUEUE_MAX ile sinirlidir;
+# doluyken gelen istekler 503 ile reddedilir.
+MESSAGE_GROUP_COMMIT = os.getenv("MESSAGE_GROUP_COMMIT", "0") == "1"
+MESSAGE_BATCH_MAX = int(os.getenv("MESSAGE_BATCH_MAX", 100))
+MESSAGE_BATCH_WAIT_MS = float(os.getenv("MESSAGE_BATCH_WAIT_MS", 0))
+MESSAGE_QUEUE_MAX = int(os.getenv("MESSAGE_QUEUE_MAX", 1000))
+
+
+class MessageWriter:
+    """Mesaj yazimlarini gruplayip tek commit ile uygular"""
+
+    def __init__(self, max_batch: int, max_wait_ms: float, queue_max: int = MESSAGE_QUEUE_MAX):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue(maxsize=queue_max)
+        self.batches = 0
+        self.messages = 0
+        self.rejected = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, sender_id: int, message: MessageCreate) -> Future:
+        future = Future()
+        try:
+            self.queue.put_nowait((sender_id, message, future))
+        except queue.Full:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Sunucu yogun, lutfen tekrar deneyin",
+                headers={"Retry-After": "1"},
+            )
+        return future
+
+    def _run(self):
+        while True:
+            batch = []
+            self._take(batch, self.queue.get())
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                # Once kuyrukta bekleyenler alinir, sonra kalan sure kadar yenileri beklenir
+                try:
+                    self._take(batch, self.queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    self._take(batch, self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+            try:
+                self._commit(batch)
+            except Exception as e:
+                # Yazici thread hicbir durumda olmemeli; aksi halde sonraki tum gonderimler asili kalir
+                self.failed += len(batch)
+                print(f"Mesaj grubu yazilamadi: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _take(self, batch: list, item):
+        # Istemci baglantiyi kapattiysa (Future iptal edildiyse) mesaj yazilmaz; calisiyor
+        # olarak isaretlenen Future artik iptal edilemez
+        if item[2].set_running_or_notify_cancel():
+            batch.append(item)
+
+    def _commit(self, batch: list):
+        results = []
+        try:
+            with get_db(write=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                for sender_id, message, future in batch:
+                    # Hatali bir mesaj ayni gruptaki digerlerini geri almasin
+                    cursor.execute("SAVEPOINT message")
+                    try:
+                        results.append((future, write_message(cursor, sender_id, message), None))
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT message")
+                        results.append((future, None, e))
+                    cursor.execute("RELEASE SAVEPOINT message")
+                conn.commit()
+        except Exception as e:
+            self.failed += len(batch)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        self.batches += 1
+        self.messages += len(batch)
+
+
+message_writer = MessageWriter(MESSAGE_BATCH_MAX, MESSAGE_BATCH_WAIT_MS) if MESSAGE_GROUP_COMMIT else None
+
+
 @app.post("/messages")
-def send_message(message: MessageCreate, user=Depends(verify_token)):
+async def send_message(message: MessageCreate, user=Depends(verify_token)):
     """Mesaj gonderir"""
-    sender_id = get_user_id_from_token(user)
+    sender_id = await run_db(get_user_id_from_token, user)
 
     if sender_id == message.receiver_id:
         raise HTTPException(status_code=400, detail="Kendinize mesaj gonderemezsiniz")
 
-    with get_db() as conn:
-        cursor = conn.cursor()
+    # Alici kontrolu okuyucu baglantida yapilir; yazma yolu yalnizca yazar
+    if not await run_db(receiver_exists, message.receiver_id):
+        raise HTTPException(status_code=404, detail="Alici kullanici bulunamadi")
 
-        # Alici kullanici var mi kontrol et
-        cursor.execute("SELECT id FROM users WHERE id=?", (message.receiver_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Alici kullanici bulunamadi")
+    if message_writer is not None:
+        message_id, receiver_unread = await asyncio.wrap_future(message_writer.submit(sender_id, message))
+    else:
+        message_id, receiver_unread = await run_db(store_message, sender_id, message)
 
-        # Mesaji kaydet
-        cursor.execute("""
-            INSERT INTO messages (sender_id, receiver_id, application_id, content)
-            VALUES (?, ?, ?, ?)
-        """, (sender_id, message.receiver_id, message.application_id, message.content))
-        message_id = cursor.lastrowid
+    unread_counters.remember(message.receiver_id, receiver_unread)
 
-        # Conversation guncelle veya olustur
-        user1 = min(sender_id, message.receiver_id)
-        user2 = max(sender_id, message.receiver_id)
+    event = {
+        "type": "message",
+        "message_id": message_id,
+        "sender_id": sender_id,
+        "receiver_id": message.receiver_id,
+        "application_id": message.application_id,
+        "content": message.content,
+    }
+    # Gonderenin diger sekmeleri de guncellensin. EVENT_FANOUT=sqlite'ta yayin bir DB
+    # yazimidir; event loop'u bloklamamak icin thread'de yapilir. Mesaj zaten kaydedildigi
+    # icin DB havuzunun kabul kontrolune (503) takilmamasi adina run_db kullanilmaz.
+    await asyncio.to_thread(publish_events, [
+        (message.receiver_id, {**event, "unread_count": receiver_unread}),
+        (sender_id, event),
+    ])
 
-        cursor.execute("""
-            INSERT INTO conversations (user1_id, user2_id, application_id, last_message_at)
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(user1_id, user2_id, application_id) DO UPDATE SET
-            last_message_at = CURRENT_TIMESTAMP
-        """, (user1, user2, message.application_id))
+    return {"success": True, "message_id": message_id}
 
-        conn.commit()
 
-    return {"success": True, "message_id": message_id}
+# ---- Mesaj gecmisi ----
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_PAGE_MAX = 200
+
+
+def message_page_query(user_id: int, other_user_id: int, application_id: Optional[int],
+                       before: Optional[int], after: Optional[int], limit: int):
+    """Mesaj sayfasi sorgusunu ve parametrelerini kurar (check_query_plans.py de kullanir).
+
+    Her yon (gonderen -> alici) indeksten ayri ayri LIMIT ile okunup birlestirilir;
+    boylece maliyet gecmisin uzunluguna degil sayfa boyutuna baglidir.
+    """
+    conditions = ""
+    params = []
+    if application_id:
+        conditions += " AND application_id = ?"
+        params.append(application_id)
+    if before is not None:
+        conditions += " AND id < ?"
+        params.append(before)
+    if after is not None:
+        conditions += " AND id > ?"
+        params.append(after)
+
+    # after verildiginde imlecten ileri (eskiden yeniye), aksi halde en yeniden geriye
+    order = "ASC" if after is not None else "DESC"
+    leg = f"""
+        SELECT * FROM (
+            SELECT id FROM messages
+            WHERE sender_id = ? AND receiver_id = ?{conditions}
+            ORDER BY id {order} LIMIT ?
+        )
+    """
+    query = f"""
+        SELECT m.*,
+               s.email as sender_email, s.full_name as sender_name,
+               r.email as receiver_email, r.full_name as receiver_name
+        FROM ({leg} UNION ALL {leg}) page
+        JOIN messages m ON m.id = page.id
+        JOIN users s ON m.sender_id = s.id
+        JOIN users r ON m.receiver_id = r.id
+        ORDER BY m.id {order}
+        LIMIT ?
+    """
+    return query, (user_id, other_user_id, *params, limit + 1,
+                   other_user_id, user_id, *params, limit + 1,
+                   limit + 1)
+
+
+def fetch_message_page(cursor, user_id: int, other_user_id: int, application_id: Optional[int],
+                       before: Optional[int], after: Optional[int], limit: int):
+    """Iki kullanici arasindaki mesajlardan bir sayfa (id sirali) getirir"""
+    cursor.execute(*message_page_query(user_id, other_user_id, application_id, before, after, limit))
+    rows = cursor.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is None:
+        rows.reverse()
+    return rows, has_more
 
 
 @app.get("/messages/{other_user_id}")
-def get_messages(other_user_id: int, application_id: Optional[int] = None, user=Depends(verify_token)):
-    """Iki kullanici arasindaki mesajlari getirir"""
+@db_handler
+def get_messages(
+    other_user_id: int,
+    application_id: Optional[int] = None,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: int = MESSAGE_PAGE_SIZE,
+    user=Depends(verify_token)
+):
+    """Iki kullanici arasindaki mesajlari sayfa sayfa getirir (varsayilan: en yeni sayfa).
+
+    before: bu id'den eski mesajlar (yukari kaydirma), after: bu id'den yeni mesajlar (yoklama).
+    Okundu bilgisi bu endpoint'te yazilmaz; POST /messages/{other_user_id}/read kullanilir.
+    """
     user_id = get_user_id_from_token(user)
 
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="before ve after birlikte kullanilamaz")
+    limit = max(1, min(limit, MESSAGE_PAGE_MAX))
+
     with get_db() as conn:
         cursor = conn.cursor()
-
-        if application_id:
-            cursor.execute("""
-                SELECT m.*,
-                       s.email as sender_email, s.full_name as sender_name,
-                       r.email as receiver_email, r.full_name as receiver_name
-                FROM messages m
-                JOIN users s ON m.sender_id = s.id
-                JOIN users r ON m.receiver_id = r.id
-                WHERE ((m.sender_id = ? AND m.receiver_id = ?) OR (m.sender_id = ? AND m.receiver_id = ?))
-                AND m.application_id = ?
-                ORDER BY m.created_at ASC
-            """, (user_id, other_user_id, other_user_id, user_id, application_id))
-        else:
-            cursor.execute("""
-                SELECT m.*,
-                       s.email as sender_email, s.full_name as sender_name,
-                       r.email as receiver_email, r.full_name as receiver_name
-                FROM messages m
-                JOIN users s ON m.sender_id = s.id
-                JOIN users r ON m.receiver_id = r.id
-                WHERE (m.sender_id = ? AND m.receiver_id = ?) OR (m.sender_id = ? AND m.receiver_id = ?)
-                ORDER BY m.created_at ASC
-            """, (user_id, other_user_id, other_user_id, user_id))
-
-        messages = cursor.fetchall()
-
-        # Okunmamis mesajlari okundu olarak isaretle
-        cursor.execute("""
-            UPDATE messages SET is_read = 1
-            WHERE receiver_id = ? AND sender_id = ? AND is_read = 0
-        """, (user_id, other_user_id))
-        conn.commit()
+        messages, has_more = fetch_message_page(
+            cursor, user_id, other_user_id, application_id, before, after, limit
+        )
 
     return {
         "messages": [
@@ -1581,11 +4241,132 @@ def get_messages(other_user_id: int, application_id: Optional[int] = None, user=
                 "is_mine": m["sender_id"] == user_id
             }
             for m in messages
-        ]
+        ],
+        "has_more": has_more,
+        "oldest_id": messages[0]["id"] if messages else None,
+        "newest_id": messages[-1]["id"] if messages else None,
     }
 
 
+# ---- Okundu bilgisi (toplu yazim) ----
+# Istemciler "su id'ye kadar okudum" bildirir; bildirimler bellekte birlestirilir
+# (okuyucu, karsi taraf) basina en buyuk id tutulur ve arka plan thread'i tarafindan
+# tek bir yazma transaction'inda uygulanir.
+READ_RECEIPT_FLUSH_INTERVAL = float(os.getenv("READ_RECEIPT_FLUSH_INTERVAL", 0.5))
+MARK_READ_SQL = """
+    UPDATE messages SET is_read = 1
+    WHERE receiver_id = ? AND sender_id = ? AND is_read = 0 AND id <= ?
+"""
+
+
+class ReadReceiptBatcher:
+    """Okundu bildirimlerini biriktirip periyodik olarak toplu uygular"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name="read-receipts", daemon=True)
+        self.thread.start()
+
+    def mark(self, reader_id: int, other_user_id: int, up_to_id: int):
+        key = (reader_id, other_user_id)
+        with self.lock:
+            if up_to_id > self.pending.get(key, 0):
+                self.pending[key] = up_to_id
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if not batch:
+            return
+
+        unread = {}
+        try:
+            with get_db(write=True) as conn:
+                cursor = conn.cursor()
+                for (reader_id, other_user_id), up_to_id in batch.items():
+                    cursor.execute(MARK_READ_SQL, (reader_id, other_user_id, up_to_id))
+                    marked = cursor.rowcount
+                    if not marked:
+                        continue
+
+                    unread[reader_id] = unread_counters.add(cursor, reader_id, -marked)
+
+                    # Kismi okuma olabilecegi icin sayac sifirlanmaz, kalan okunmamislardan hesaplanir
+                    side = "user1_unread" if reader_id < other_user_id else "user2_unread"
+                    cursor.execute(f"""
+                        UPDATE conversations SET {side} = (
+                            SELECT COUNT(*) FROM messages m
+                            WHERE m.receiver_id = ? AND m.is_read = 0 AND m.sender_id = ?
+                            AND m.application_id IS conversations.application_id
+                        )
+                        WHERE user1_id = ? AND user2_id = ?
+                    """, (reader_id, other_user_id,
+                          min(reader_id, other_user_id), max(reader_id, other_user_id)))
+                conn.commit()
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Okundu bilgisi yazilamadi ({len(batch)} sohbet): {e}")
+            return
+
+        for reader_id, count in unread.items():
+            unread_counters.remember(reader_id, count)
+
+        self.flushed += len(batch)
+        self.batches += 1
+
+
+read_receipts = ReadReceiptBatcher(READ_RECEIPT_FLUSH_INTERVAL)
+
+
+@app.on_event("shutdown")
+def flush_read_receipts():
+    read_receipts.flush()
+
+
+@app.post("/messages/{other_user_id}/read")
+@db_handler
+def mark_messages_read(other_user_id: int, request: MarkReadRequest, user=Depends(verify_token)):
+    """Karsi taraftan gelen, up_to_id'ye kadarki mesajlari okundu olarak isaretler (toplu uygulanir)"""
+    user_id = get_user_id_from_token(user)
+    read_receipts.mark(user_id, other_user_id, request.up_to_id)
+    return {"success": True}
+
+
+# Ozet tablosundan tek sorgu: maliyet mesaj gecmisiyle degil sohbet sayisiyla buyur
+CONVERSATIONS_SQL = """
+    SELECT u.id as other_user_id,
+           u.email as other_user_email,
+           u.full_name as other_user_name,
+           u.role as other_user_role,
+           u.company_name,
+           c.application_id,
+           j.title as job_title,
+           c.last_message,
+           c.last_message_at,
+           CASE WHEN c.user1_id = ? THEN c.user1_unread ELSE c.user2_unread END as unread_count
+    FROM conversations c
+    JOIN users u ON u.id = CASE WHEN c.user1_id = ? THEN c.user2_id ELSE c.user1_id END
+    LEFT JOIN applications a ON c.application_id = a.id
+    LEFT JOIN jobs j ON a.job_id = j.id
+    WHERE c.user1_id = ? OR c.user2_id = ?
+    ORDER BY c.last_message_at DESC, c.last_message_id DESC
+"""
+
+
 @app.get("/conversations")
+@db_handler
 def get_conversations(user=Depends(verify_token)):
     """Kullanicinin tum sohbetlerini listeler"""
     user_id = get_user_id_from_token(user)
@@ -1593,31 +4374,7 @@ def get_conversations(user=Depends(verify_token)):
     with get_db() as conn:
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT DISTINCT
-                CASE WHEN m.sender_id = ? THEN m.receiver_id ELSE m.sender_id END as other_user_id,
-                u.email as other_user_email,
-                u.full_name as other_user_name,
-                u.role as other_user_role,
-                u.company_name,
-                m.application_id,
-                j.title as job_title,
-                (SELECT content FROM messages
-                 WHERE (sender_id = ? AND receiver_id = u.id) OR (sender_id = u.id AND receiver_id = ?)
-                 ORDER BY created_at DESC LIMIT 1) as last_message,
-                (SELECT created_at FROM messages
-                 WHERE (sender_id = ? AND receiver_id = u.id) OR (sender_id = u.id AND receiver_id = ?)
-                 ORDER BY created_at DESC LIMIT 1) as last_message_at,
-                (SELECT COUNT(*) FROM messages
-                 WHERE sender_id = u.id AND receiver_id = ? AND is_read = 0) as unread_count
-            FROM messages m
-            JOIN users u ON (CASE WHEN m.sender_id = ? THEN m.receiver_id ELSE m.sender_id END) = u.id
-            LEFT JOIN applications a ON m.application_id = a.id
-            LEFT JOIN jobs j ON a.job_id = j.id
-            WHERE m.sender_id = ? OR m.receiver_id = ?
-            GROUP BY other_user_id, m.application_id
-            ORDER BY last_message_at DESC
-        """, (user_id, user_id, user_id, user_id, user_id, user_id, user_id, user_id, user_id))
+        cursor.execute(CONVERSATIONS_SQL, (user_id, user_id, user_id, user_id))
 
         conversations = cursor.fetchall()
 
@@ -1641,26 +4398,186 @@ def get_conversations(user=Depends(verify_token)):
 
 
 @app.get("/unread-count")
+@db_handler
 def get_unread_count(user=Depends(verify_token)):
     """Okunmamis mesaj sayisini dondurur"""
     user_id = get_user_id_from_token(user)
+    return {"unread_count": unread_counters.get(user_id)}
+
+
+# ============================================================
+# NOTIFICATIONS
+# ============================================================
+
+# ---- Yeni ilan uyarilari ----
+# Olusturulan ilan, arka plan thread'inde tum CV matrisiyle bloklar halinde tek
+# carpimda skorlanir; skoru JOB_ALERT_MIN_SCORE'u (eslesme yuzdesi) gecen is
+# arayanlara bildirim yazilir ve "job_alert" olayi olarak itilir. Bir ilan en fazla
+# JOB_ALERT_MAX_PER_JOB kisiye (en yuksek skorlular) bildirilir. create_job beklemez.
+JOB_ALERT_MIN_SCORE = float(os.getenv("JOB_ALERT_MIN_SCORE", 70))
+JOB_ALERT_MAX_PER_JOB = int(os.getenv("JOB_ALERT_MAX_PER_JOB", 1000))
+JOB_ALERT_BLOCK = 65536
+
+
+class JobAlerter:
+    """Yeni ilanlari CV'lere karsi skorlayip eslesen kullanicilara bildirim gonderir"""
+
+    def __init__(self, min_score: float, max_per_job: int):
+        self.min_score = min_score
+        self.max_per_job = max_per_job
+        self.queue = queue.Queue()
+        self.jobs = 0
+        self.notified = 0
+        self.last_scan_ms = 0.0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="job-alerts", daemon=True)
+        self.thread.start()
+
+    def job_created(self, job_id: int):
+        if self.thread is not None:
+            self.queue.put(job_id)
+
+    def _run(self):
+        while True:
+            job_id = self.queue.get()
+            try:
+                self.alert(job_id)
+            except Exception as e:
+                print(f"Ilan bildirimi gonderilemedi: {e}")
+
+    def alert(self, job_id: int) -> int:
+        """Ilani tum CV'lere karsi skorlar; bildirim gonderilen kullanici sayisini dondurur"""
+        entry = get_job_index().get(job_id)
+        if entry is None:
+            return 0
+        job_vector = entry[0]
+
+        started = time.perf_counter()
+        snapshot = get_cv_index().snapshot()
+        threshold = self.min_score / 100
+        rows, scores = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.float32)]
+        for r0 in range(0, len(snapshot.ids), JOB_ALERT_BLOCK):
+            block_scores = snapshot.matrix[r0:r0 + JOB_ALERT_BLOCK] @ job_vector
+            hits = np.flatnonzero(snapshot.alive[r0:r0 + JOB_ALERT_BLOCK] & (block_scores >= threshold))
+            rows.append(hits + r0)
+            scores.append(block_scores[hits])
+        rows, scores = np.concatenate(rows), np.concatenate(scores)
+        if len(rows) > self.max_per_job:
+            keep = np.argpartition(-scores, self.max_per_job - 1)[:self.max_per_job]
+            rows, scores = rows[keep], scores[keep]
+        self.last_scan_ms = (time.perf_counter() - started) * 1000
+        self.jobs += 1
+        if not len(rows):
+            return 0
+
+        alerts = [(int(user_id), round(float(score) * 100, 1)) for user_id, score in zip(snapshot.ids[rows], scores)]
+        with get_db(write=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT title FROM jobs WHERE id=?", (job_id,))
+            job = cursor.fetchone()
+            if not job:
+                return 0
+            cursor.executemany(
+                "INSERT OR IGNORE INTO notifications (user_id, type, job_id, score) VALUES (?, 'job_alert', ?, ?)",
+                [(user_id, job_id, score) for user_id, score in alerts],
+            )
+            conn.commit()
+
+        publish_events([
+            (user_id, {"type": "job_alert", "job_id": job_id, "title": job["title"], "score": score})
+            for user_id, score in alerts
+        ])
+        self.notified += len(alerts)
+        return len(alerts)
+
+
+job_alerter = JobAlerter(JOB_ALERT_MIN_SCORE, JOB_ALERT_MAX_PER_JOB)
+if model is not None:
+    job_alerter.start()
+
+
+NOTIFICATION_PAGE_SIZE = 20
+NOTIFICATION_PAGE_MAX = 100
+
+
+@app.get("/notifications")
+@db_handler
+def get_notifications(before: Optional[int] = None, limit: int = NOTIFICATION_PAGE_SIZE, user=Depends(verify_token)):
+    """Kullanicinin bildirimlerini yeniden eskiye dondurur (before: bu id'den eskiler)"""
+    if limit < 1 or limit > NOTIFICATION_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit 1 ile {NOTIFICATION_PAGE_MAX} arasinda olmali")
+
+    user_id = get_user_id_from_token(user)
 
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT COUNT(*) as count FROM messages
-            WHERE receiver_id = ? AND is_read = 0
-        """, (user_id,))
-        result = cursor.fetchone()
+            SELECT n.id, n.type, n.job_id, n.score, n.is_read, n.created_at,
+                   j.title as job_title, u.company_name
+            FROM notifications n
+            LEFT JOIN jobs j ON j.id = n.job_id
+            LEFT JOIN users u ON u.id = j.employer_id
+            WHERE n.user_id = ? AND n.id < ?
+            ORDER BY n.id DESC
+            LIMIT ?
+        """, (user_id, before or 2 ** 63 - 1, limit + 1))
+        rows = cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) as count FROM notifications WHERE user_id = ? AND is_read = 0", (user_id,))
+        unread_count = cursor.fetchone()["count"]
+
+    return {
+        "notifications": [
+            {
+                "id": r["id"],
+                "type": r["type"],
+                "job_id": r["job_id"],
+                "job_title": r["job_title"],
+                "company_name": r["company_name"],
+                "score": r["score"],
+                "is_read": bool(r["is_read"]),
+                "created_at": r["created_at"],
+            }
+            for r in rows[:limit]
+        ],
+        "unread_count": unread_count,
+        "has_more": len(rows) > limit,
+    }
 
-    return {"unread_count": result["count"]}
+
+@app.post("/notifications/read")
+@db_handler
+def mark_notifications_read(request: NotificationsReadRequest, user=Depends(verify_token)):
+    """up_to_id'ye kadarki (verilmezse tum) bildirimleri okundu olarak isaretler"""
+    user_id = get_user_id_from_token(user)
+
+    with get_db(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE notifications SET is_read = 1 WHERE user_id = ? AND is_read = 0 AND id <= ?",
+            (user_id, request.up_to_id or 2 ** 63 - 1),
+        )
+        marked = cursor.rowcount
+        conn.commit()
+
+    return {"success": True, "marked": marked}
 
 
 # ============================================================
 # EMPLOYER - MY JOBS
 # ============================================================
 
+EMPLOYER_JOBS_SQL = """
+    SELECT j.id, j.title, j.description, j.created_at, j.application_count
+    FROM jobs j
+    WHERE j.employer_id = ?
+    ORDER BY j.created_at DESC
+"""
+
+
 @app.get("/my-jobs")
+@db_handler
 def get_my_jobs(user=Depends(verify_token)):
     """Isverenin kendi ilanlarini getirir"""
     role = user.get("role")
@@ -1671,13 +4588,7 @@ def get_my_jobs(user=Depends(verify_token)):
 
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT j.*,
-                   (SELECT COUNT(*) FROM applications WHERE job_id = j.id) as application_count
-            FROM jobs j
-            WHERE j.employer_id = ?
-            ORDER BY j.created_at DESC
-        """, (user_id,))
+        cursor.execute(EMPLOYER_JOBS_SQL, (user_id,))
         jobs = cursor.fetchall()
 
     return {
@@ -1694,35 +4605,79 @@ def get_my_jobs(user=Depends(verify_token)):
     }
 
 
+def job_applications_query(job_id: int, sort: str, after: Optional[list], limit: int):
+    """Ilana gelen basvurular sayfasinin sorgusunu ve parametrelerini kurar (check_query_plans.py de kullanir)"""
+    sort_column = "a.match_score" if sort == "score" else "a.applied_at"
+    where = "a.job_id = ?"
+    params = [job_id]
+    if after:
+        # Satir-deger karsilastirmasi (job_id, skor/tarih, id) indeksinde aralik aramasi yapar
+        where += f" AND ({sort_column}, a.id) < (?, ?)"
+        params += [after[0], after[1]]
+
+    query = f"""
+        SELECT a.id, a.user_id, a.status, a.applied_at, a.cover_letter, a.match_score,
+               u.email, u.full_name, u.phone, u.location, u.skills, u.linkedin,
+               c.filename as cv_filename,
+               substr(c.text_content, 1, 501) as cv_preview
+        FROM applications a
+        JOIN users u ON a.user_id = u.id
+        LEFT JOIN cvs c ON a.cv_id = c.id
+        WHERE {where}
+        ORDER BY {sort_column} DESC, a.id DESC
+        LIMIT ?
+    """
+    return query, params + [limit]
+
+
 @app.get("/my-jobs/{job_id}/applications")
-def get_job_applications(job_id: int, user=Depends(verify_token)):
-    """Bir ilana gelen basvurulari getirir"""
+def get_job_applications(
+    job_id: int,
+    sort: str = "date",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    user=Depends(verify_token)
+):
+    """Bir ilana gelen basvurulari getirir.
+
+    sort=date (basvuru tarihi) veya sort=score (eslesme skoru) ile siralanir;
+    sonraki sayfa icin donen next_cursor kullanilir.
+    """
     role = user.get("role")
     if role != "employer":
         raise HTTPException(status_code=403, detail="Sadece isverenler bu endpoint'i kullanabilir")
 
+    if sort not in ["date", "score"]:
+        raise HTTPException(status_code=400, detail="sort 'date' veya 'score' olmali")
+    if limit < 1 or limit > 200:
+        raise HTTPException(status_code=400, detail="limit 1 ile 200 arasinda olmali")
+    if sort == "score" and model is None:
+        raise HTTPException(status_code=500, detail="Model yuklenemedi")
+
+    after = decode_cursor(cursor, (CURSOR_NUMBER if sort == "score" else str, int)) if cursor else None
     user_id = get_user_id_from_token(user)
 
-    with get_db() as conn:
-        cursor = conn.cursor()
+    with get_db(write=(sort == "score")) as conn:
+        db = conn.cursor()
 
         # Ilanin bu isverene ait oldugunu kontrol et
-        cursor.execute("SELECT id FROM jobs WHERE id = ? AND employer_id = ?", (job_id, user_id))
-        if not cursor.fetchone():
+        db.execute("SELECT id FROM jobs WHERE id = ? AND employer_id = ?", (job_id, user_id))
+        if not db.fetchone():
             raise HTTPException(status_code=404, detail="Ilan bulunamadi veya size ait degil")
 
-        cursor.execute("""
-            SELECT a.*,
-                   u.email, u.full_name, u.phone, u.location, u.skills, u.linkedin,
-                   c.filename as cv_filename,
-                   c.text_content as cv_text
-            FROM applications a
-            JOIN users u ON a.user_id = u.id
-            LEFT JOIN cvs c ON a.cv_id = c.id
-            WHERE a.job_id = ?
-            ORDER BY a.applied_at DESC
-        """, (job_id,))
-        applications = cursor.fetchall()
+        if sort == "score":
+            # Yalnizca skoru henuz olmayan (eski) basvurular hesaplanir
+            score_applications(db, job_id)
+            conn.commit()
+
+        db.execute(*job_applications_query(job_id, sort, after, limit + 1))
+        applications = db.fetchall()
+
+    next_cursor = None
+    if len(applications) > limit:
+        applications = applications[:limit]
+        last = applications[-1]
+        next_cursor = encode_cursor([last["match_score" if sort == "score" else "applied_at"], last["id"]])
 
     return {
         "applications": [
@@ -1732,6 +4687,7 @@ def get_job_applications(job_id: int, user=Depends(verify_token)):
                 "status": a["status"],
                 "applied_at": a["applied_at"],
                 "cover_letter": a["cover_letter"],
+                "match_score": a["match_score"],
                 "applicant": {
                     "email": a["email"],
                     "full_name": a["full_name"],
@@ -1741,10 +4697,88 @@ def get_job_applications(job_id: int, user=Depends(verify_token)):
                     "linkedin": a["linkedin"]
                 },
                 "cv_filename": a["cv_filename"],
-                "cv_preview": a["cv_text"][:500] + "..." if a["cv_text"] and len(a["cv_text"]) > 500 else a["cv_text"]
+                "cv_preview": a["cv_preview"][:500] + "..." if a["cv_preview"] and len(a["cv_preview"]) > 500 else a["cv_preview"]
             }
             for a in applications
-        ]
+        ],
+        "next_cursor": next_cursor
+    }
+
+
+CANDIDATE_SEARCH_MAX_RESULTS = 1000
+
+
+@app.get("/my-jobs/{job_id}/candidates")
+def search_candidates(job_id: int, page: int = 1, limit: int = 20, user=Depends(verify_token)):
+    """Ilana en uygun adaylari (aramaya acik is arayanlarin son CV'leri) siralar"""
+    role = user.get("role")
+    if role != "employer":
+        raise HTTPException(status_code=403, detail="Sadece isverenler bu endpoint'i kullanabilir")
+
+    if page < 1 or limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="Gecersiz sayfalama parametreleri")
+    if page * limit > CANDIDATE_SEARCH_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"En fazla ilk {CANDIDATE_SEARCH_MAX_RESULTS} aday listelenebilir")
+
+    user_id = get_user_id_from_token(user)
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM jobs WHERE id = ? AND employer_id = ?", (job_id, user_id))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Ilan bulunamadi veya size ait degil")
+
+    entry = get_job_index().get(job_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Ilanin embedding'i bulunamadi")
+    job_vector = entry[0]
+
+    snapshot = get_cv_index().snapshot()
+    searchable = snapshot.meta["open_to_work"]
+    total = int(np.count_nonzero(snapshot.alive & searchable))
+
+    user_ids, sims = next(top_k_search(snapshot, job_vector, page * limit, mask=searchable))
+    offset = (page - 1) * limit
+    page_ids = [int(candidate_id) for candidate_id in user_ids[offset:offset + limit]]
+    page_scores = sims[offset:offset + limit]
+
+    candidates = []
+    if page_ids:
+        with get_db() as conn:
+            cursor = conn.cursor()
+            placeholders = ",".join("?" * len(page_ids))
+            cursor.execute(f"""
+                SELECT u.id, u.email, u.full_name, u.location, u.skills, u.linkedin,
+                       c.id as cv_id, c.filename as cv_filename
+                FROM users u
+                JOIN cvs c ON c.id = (SELECT MAX(id) FROM cvs WHERE user_id = u.id)
+                WHERE u.id IN ({placeholders})
+            """, page_ids)
+            people = {r["id"]: r for r in cursor.fetchall()}
+
+        for candidate_id, sim in zip(page_ids, page_scores):
+            person = people.get(candidate_id)
+            if person is None:
+                continue
+            candidates.append({
+                "user_id": candidate_id,
+                "score": round(max(float(sim), 0) * 100, 1),
+                "cv_id": person["cv_id"],
+                "cv_filename": person["cv_filename"],
+                "applicant": {
+                    "email": person["email"],
+                    "full_name": person["full_name"],
+                    "location": person["location"],
+                    "skills": person["skills"],
+                    "linkedin": person["linkedin"]
+                }
+            })
+
+    return {
+        "candidates": candidates,
+        "total": total,
+        "page": page,
+        "limit": limit
     }
 
 
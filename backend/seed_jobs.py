@@ -505,6 +505,10 @@ def seed_jobs():
             VALUES (?, ?, 'employer', 'Matchify HR', 'Matchify Tech')
         """, ("employer@test.com", hashed.decode("utf-8")))
         employer_id = cursor.lastrowid
+        # Sirket filtresi sadelestirilmis kolondan okunur (sunucu migration'i eklemisse)
+        cursor.execute("SELECT 1 FROM pragma_table_info('users') WHERE name = 'company_name_norm'")
+        if cursor.fetchone():
+            cursor.execute("UPDATE users SET company_name_norm = 'matchify tech' WHERE id = ?", (employer_id,))
         print(f"Employer hesabı oluşturuldu: employer@test.com / 123456")
     else:
         employer_id = employer[0]
@@ -521,6 +525,21 @@ def seed_jobs():
             VALUES (?, ?, ?)
         """, (employer_id, job["title"], job["description"].strip()))
 
+    # Panel sayaclari sunucu tarafindan tutulur; dogrudan eklenen ilanlar icin yeniden hesapla
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user_stats'")
+    if cursor.fetchone():
+        cursor.execute("""
+            UPDATE user_stats SET
+                job_count = (SELECT COUNT(*) FROM jobs WHERE employer_id = user_stats.user_id),
+                received_application_count = (
+                    SELECT COALESCE(SUM(application_count), 0) FROM jobs WHERE employer_id = user_stats.user_id
+                )
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO user_stats (user_id, job_count)
+            SELECT employer_id, COUNT(*) FROM jobs WHERE employer_id IS NOT NULL GROUP BY employer_id
+        """)
+
     conn.commit()
     conn.close()
 
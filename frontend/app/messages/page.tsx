@@ -42,6 +42,11 @@ export default function MessagesPage() {
   const [selectedConversation, setSelectedConversation] = useState<Conversation | null>(null);
   const [messages, setMessages] = useState<Message[]>([]);
   const [loadingMessages, setLoadingMessages] = useState(false);
+  const [hasOlder, setHasOlder] = useState(false);
+  const [oldestId, setOldestId] = useState<number | null>(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
+  // Eski mesajlar başa eklenince en alta kaydırılmaz
+  const skipScrollRef = useRef(false);
   const [newMessage, setNewMessage] = useState("");
   const [sending, setSending] = useState(false);
 
@@ -66,7 +71,36 @@ export default function MessagesPage() {
     }
   }, [router, searchParams]);
 
+  // Açık sohbet, olay dinleyicisinin içinden güncel haliyle okunabilsin
+  const selectedRef = useRef<Conversation | null>(null);
   useEffect(() => {
+    selectedRef.current = selectedConversation;
+  }, [selectedConversation]);
+
+  // Yeni mesajlar sunucudan anlık olarak gelir (Server-Sent Events)
+  useEffect(() => {
+    const token = localStorage.getItem("access_token");
+    if (!token) return;
+
+    const source = new EventSource(`${API_URL}/events?token=${encodeURIComponent(token)}`);
+    source.addEventListener("message", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      loadConversations();
+
+      const current = selectedRef.current;
+      if (current && (data.sender_id === current.other_user_id || data.receiver_id === current.other_user_id)) {
+        selectConversation(current);
+      }
+    });
+
+    return () => source.close();
+  }, []);
+
+  useEffect(() => {
+    if (skipScrollRef.current) {
+      skipScrollRef.current = false;
+      return;
+    }
     scrollToBottom();
   }, [messages]);
 
@@ -118,6 +152,16 @@ export default function MessagesPage() {
     };
     setSelectedConversation(newConv);
     setMessages([]);
+    setHasOlder(false);
+    setOldestId(null);
+  };
+
+  const messagesUrl = (conv: Conversation, before?: number) => {
+    const params = new URLSearchParams();
+    if (conv.application_id) params.set("application_id", String(conv.application_id));
+    if (before) params.set("before", String(before));
+    const query = params.toString();
+    return `${API_URL}/messages/${conv.other_user_id}${query ? `?${query}` : ""}`;
   };
 
   const selectConversation = async (conv: Conversation) => {
@@ -126,15 +170,23 @@ export default function MessagesPage() {
 
     try {
       const token = localStorage.getItem("access_token");
-      const url = conv.application_id
-        ? `${API_URL}/messages/${conv.other_user_id}?application_id=${conv.application_id}`
-        : `${API_URL}/messages/${conv.other_user_id}`;
-
-      const res = await fetch(url, {
+      const res = await fetch(messagesUrl(conv), {
         headers: { Authorization: `Bearer ${token}` },
       });
       const data = await res.json();
-      setMessages(data.messages || []);
+      const loaded: Message[] = data.messages || [];
+      setMessages(loaded);
+      setHasOlder(Boolean(data.has_more));
+      setOldestId(data.oldest_id ?? null);
+
+      // Görülen son mesaja kadar okundu bilgisi gönder
+      if (loaded.some((m) => !m.is_mine && !m.is_read)) {
+        fetch(`${API_URL}/messages/${conv.other_user_id}/read`, {
+          method: "POST",
+          headers: getAuthHeaders(),
+          body: JSON.stringify({ up_to_id: loaded[loaded.length - 1].id }),
+        }).catch((err) => console.error("Okundu bilgisi gönderilemedi:", err));
+      }
 
       // Okunmamış mesaj sayısını sıfırla
       setConversations((prev) =>
@@ -149,6 +201,29 @@ export default function MessagesPage() {
     setLoadingMessages(false);
   };
 
+  // Sunucu en yeni sayfayı döner; daha eskiler before=oldest_id ile sayfa sayfa alınır
+  const loadOlderMessages = async () => {
+    if (!selectedConversation || !oldestId || loadingOlder) return;
+    setLoadingOlder(true);
+
+    try {
+      const token = localStorage.getItem("access_token");
+      const res = await fetch(messagesUrl(selectedConversation, oldestId), {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      const data = await res.json();
+      const older: Message[] = data.messages || [];
+      skipScrollRef.current = true;
+      setMessages((prev) => [...older, ...prev]);
+      setHasOlder(Boolean(data.has_more));
+      if (data.oldest_id) setOldestId(data.oldest_id);
+    } catch (err) {
+      console.error("Eski mesajlar alınamadı:", err);
+    }
+
+    setLoadingOlder(false);
+  };
+
   const sendMessage = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!newMessage.trim() || !selectedConversation) return;
@@ -353,6 +428,17 @@ export default function MessagesPage() {
                       </div>
                     ) : (
                       <>
+                        {hasOlder && (
+                          <div className="text-center">
+                            <button
+                              onClick={loadOlderMessages}
+                              disabled={loadingOlder}
+                              className="btn btn-ghost text-sm"
+                            >
+                              {loadingOlder ? "Yükleniyor..." : "Daha eski mesajları yükle"}
+                            </button>
+                          </div>
+                        )}
                         {messages.map((msg) => (
                           <div
                             key={msg.id}